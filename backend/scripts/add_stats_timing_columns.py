@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Stats timing columns migration script.
+
+Adds the running sum and sample count columns behind the chatbot_stats
+response and retrieval time averages to an existing database. Run once
+after upgrading; it is safe to run again.
+
+Today's rows are rebuilt from raw messages by the first stats aggregation
+run after the upgrade. Earlier days keep their stored averages.
+
+Usage:
+    python scripts/add_stats_timing_columns.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+
+ADD_COLUMNS_SQL = """
+ALTER TABLE chatbot_stats
+ADD COLUMN IF NOT EXISTS response_time_sum_ms BIGINT DEFAULT 0,
+ADD COLUMN IF NOT EXISTS response_time_samples INTEGER DEFAULT 0,
+ADD COLUMN IF NOT EXISTS retrieval_time_sum_ms BIGINT DEFAULT 0,
+ADD COLUMN IF NOT EXISTS retrieval_time_samples INTEGER DEFAULT 0
+"""
+
+
+async def migrate() -> None:
+    """Add the stats timing columns if they are missing."""
+    from src.core.database import engine
+
+    async with engine.begin() as conn:
+        await conn.execute(text(ADD_COLUMNS_SQL))
+
+    await engine.dispose()
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Add chatbot_stats timing sum and sample columns",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.parse_args()
+
+    asyncio.run(migrate())
+    print("✓ chatbot_stats timing columns are in place")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Message chatbot_id backfill script.
+
+Adds the denormalized messages.chatbot_id column and its stats index to an
+existing database, then copies chatbot_id from each message's session in
+batches. Run once after upgrading; it is safe to run again.
+
+Usage:
+    python scripts/backfill_message_chatbot_id.py
+
+    # Smaller batches to keep lock times short on busy databases
+    python scripts/backfill_message_chatbot_id.py --batch-size 5000
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+
+ADD_COLUMN_SQL = """
+ALTER TABLE messages
+ADD COLUMN IF NOT EXISTS chatbot_id UUID
+REFERENCES chatbot_services(id) ON DELETE CASCADE
+"""
+
+CREATE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_message_chatbot_created_role
+ON messages(chatbot_id, created_at, role)
+INCLUDE (response_time_ms, input_tokens, output_tokens, retrieval_count, retrieval_time_ms)
+"""
+
+BACKFILL_BATCH_SQL = """
+UPDATE messages m
+SET chatbot_id = s.chatbot_id
+FROM conversation_sessions s
+WHERE m.session_id = s.id
+  AND m.id IN (
+      SELECT id FROM messages
+      WHERE chatbot_id IS NULL
+      LIMIT :batch_size
+  )
+"""
+
+
+async def backfill(batch_size: int) -> int:
+    """
+    Add the column and index, then backfill chatbot_id in batches.
+
+    Args:
+        batch_size: Messages updated per transaction
+
+    Returns:
+        Total number of messages updated
+    """
+    from src.core.database import engine
+
+    async with engine.begin() as conn:
+        await conn.execute(text(ADD_COLUMN_SQL))
+        await conn.execute(text(CREATE_INDEX_SQL))
+    print("✓ Column and index are in place")
+
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                text(BACKFILL_BATCH_SQL), {"batch_size": batch_size}
+            )
+        if result.rowcount == 0:
+            break
+        total += result.rowcount
+        print(f"  Updated {total} messages")
+
+    await engine.dispose()
+    return total
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Backfill messages.chatbot_id from conversation sessions",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=10000,
+        help="Messages updated per transaction (default: 10000)",
+    )
+    args = parser.parse_args()
+
+    total = asyncio.run(backfill(args.batch_size))
+    print(f"✓ Backfilled chatbot_id on {total} messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
 """
 Dashboard API router for system overview and statistics.
 """
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.database import get_db
@@ -20,6 +20,35 @@ from src.models.stats import ChatbotStats
 
 router = APIRouter()
 
+# Prebuilt per-chatbot statements, compiled once and bound at execute time
+_CHATBOT_SESSIONS_STMT = (
+    select(func.count())
+    .select_from(ConversationSession)
+    .where(
+        and_(
+            ConversationSession.chatbot_id == bindparam("chatbot_id"),
+            ConversationSession.created_at >= bindparam("range_start"),
+            ConversationSession.created_at < bindparam("range_end"),
+        )
+    )
+)
+_CHATBOT_MESSAGES_STMT = (
+    select(func.count())
+    .select_from(Message)
+    .where(
+        and_(
+            Message.chatbot_id == bindparam("chatbot_id"),
+            Message.created_at >= bindparam("range_start"),
+            Message.created_at < bindparam("range_end"),
+        )
+    )
+)
+_CHATBOT_DOCUMENTS_STMT = (
+    select(func.count())
+    .select_from(Document)
+    .where(Document.chatbot_id == bindparam("chatbot_id"))
+)
+
 
 # =============================================================================
 # Response Schemas
@@ -99,8 +128,8 @@ async def get_dashboard(
     active_chatbots = active_chatbots_result.scalar() or 0
 
     # Get today's stats
-    today_start = datetime.combine(today, datetime.min.time())
-    today_end = datetime.combine(today, datetime.max.time())
+    today_start = datetime.combine(today, time.min)
+    tomorrow_start = today_start + timedelta(days=1)
 
     today_sessions_result = await db.execute(
         select(func.count())
@@ -108,7 +137,7 @@ async def get_dashboard(
         .where(
             and_(
                 ConversationSession.created_at >= today_start,
-                ConversationSession.created_at <= today_end,
+                ConversationSession.created_at < tomorrow_start,
             )
         )
     )
@@ -120,14 +149,14 @@ async def get_dashboard(
         .where(
             and_(
                 Message.created_at >= today_start,
-                Message.created_at <= today_end,
+                Message.created_at < tomorrow_start,
             )
         )
     )
     today_messages = today_messages_result.scalar() or 0
 
     # Get this week's stats
-    week_start = datetime.combine(week_ago, datetime.min.time())
+    week_start = datetime.combine(week_ago, time.min)
 
     week_sessions_result = await db.execute(
         select(func.count())
@@ -165,7 +194,7 @@ async def get_dashboard(
         .where(
             and_(
                 Message.created_at >= today_start,
-                Message.created_at <= today_end,
+                Message.created_at < tomorrow_start,
                 Message.role == MessageRole.ASSISTANT,
             )
         )
@@ -184,40 +213,22 @@ async def get_dashboard(
     recent_chatbots = []
     for chatbot in chatbots:
         # Get today's stats for this chatbot
-        chatbot_sessions_result = await db.execute(
-            select(func.count())
-            .select_from(ConversationSession)
-            .where(
-                and_(
-                    ConversationSession.chatbot_id == chatbot.id,
-                    ConversationSession.created_at >= today_start,
-                    ConversationSession.created_at <= today_end,
-                )
-            )
-        )
-        chatbot_sessions = chatbot_sessions_result.scalar() or 0
-
-        chatbot_messages_result = await db.execute(
-            select(func.count())
-            .select_from(Message)
-            .join(ConversationSession, Message.session_id == ConversationSession.id)
-            .where(
-                and_(
-                    ConversationSession.chatbot_id == chatbot.id,
-                    Message.created_at >= today_start,
-                    Message.created_at <= today_end,
-                )
-            )
-        )
-        chatbot_messages = chatbot_messages_result.scalar() or 0
+        today_params = {
+            "chatbot_id": chatbot.id,
+            "range_start": today_start,
+            "range_end": tomorrow_start,
+        }
+        chatbot_sessions = (
+            await db.scalar(_CHATBOT_SESSIONS_STMT, today_params)
+        ) or 0
+        chatbot_messages = (
+            await db.scalar(_CHATBOT_MESSAGES_STMT, today_params)
+        ) or 0
 
         # Get document count for this chatbot
-        doc_count_result = await db.execute(
-            select(func.count())
-            .select_from(Document)
-            .where(Document.chatbot_id == chatbot.id)
-        )
-        doc_count = doc_count_result.scalar() or 0
+        doc_count = (
+            await db.scalar(_CHATBOT_DOCUMENTS_STMT, {"chatbot_id": chatbot.id})
+        ) or 0
 
         recent_chatbots.append(ChatbotSummary(
             id=chatbot.id,
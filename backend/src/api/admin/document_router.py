@@ -567,13 +567,14 @@ async def get_document_graph_details(
                 ChunkInfo(
                     id=str(point.id),
                     text=point.payload.get("text", "")[:500],  # Truncate for display
-                    page=point.payload.get("page_number"),
+                    page=point.payload.get("page_num"),
                     position=point.payload.get("chunk_index", idx),
                 )
                 for idx, point in enumerate(points)
             ]
-            # Sort by position
-            chunks.sort(key=lambda x: x.position)
+            # Sort by page, then position; chunk indexes restart for each
+            # page range of a large PDF
+            chunks.sort(key=lambda x: (x.page or 0, x.position))
     except Exception as e:
         print(f"Error fetching chunks: {e}")
 
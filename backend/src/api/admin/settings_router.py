@@ -246,12 +246,12 @@ async def reprocess_documents(
             message="No documents to reprocess",
         )
 
-    # Update status to pending
+    # Update status to pending and clear chunk_count so the task re-embeds
     doc_ids = [doc.id for doc in documents]
     await db.execute(
         update(Document)
         .where(Document.id.in_(doc_ids))
-        .values(status=DocumentStatus.PENDING)
+        .values(status=DocumentStatus.PENDING, chunk_count=None)
     )
     await db.commit()
 
@@ -1,7 +1,7 @@
 """
 Admin statistics API router.
 """
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
@@ -358,8 +358,8 @@ async def get_conversations_by_date(
         )
 
     # Date boundaries
-    day_start = datetime.combine(target_date, datetime.min.time())
-    day_end = datetime.combine(target_date, datetime.max.time())
+    day_start = datetime.combine(target_date, time.min)
+    next_day_start = day_start + timedelta(days=1)
 
     # Query sessions for the date
     query = (
@@ -368,7 +368,7 @@ async def get_conversations_by_date(
             and_(
                 ConversationSession.chatbot_id == chatbot_id,
                 ConversationSession.created_at >= day_start,
-                ConversationSession.created_at <= day_end,
+                ConversationSession.created_at < next_day_start,
             )
         )
         .order_by(ConversationSession.created_at.desc())
@@ -3,7 +3,11 @@ Celery application configuration for background task processing.
 """
 import asyncio
 import logging
+import os
+import threading
+from typing import Any, Coroutine, Optional
 
+import redis
 from celery import Celery
 from celery.signals import worker_process_init
 
@@ -52,6 +56,9 @@ celery_app.conf.update(
 
     # Task routing (optional)
     task_routes={
+        # LLM-bound stages get their own queue so they don't hold document workers
+        "src.workers.document_tasks.build_document_graph": {"queue": "llm"},
+        "src.workers.document_tasks.extract_entities_task": {"queue": "llm"},
         "src.workers.document_tasks.*": {"queue": "documents"},
         "src.workers.stats_tasks.*": {"queue": "stats"},
     },
@@ -87,6 +94,60 @@ class OllamaRateLimitedTask(celery_app.Task):
             return super().__call__(*args, **kwargs)
 
 
+# Persistent event loop for running async code from sync tasks
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_loop_lock = threading.Lock()
+
+
+def run_async(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Run a coroutine on the worker's persistent event loop and wait for it.
+
+    The loop runs on a daemon thread for the lifetime of the worker process,
+    so tasks don't pay for loop setup/teardown and async clients created on
+    it can be reused across tasks.
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        Result of the coroutine
+    """
+    global _loop, _loop_pid
+
+    with _loop_lock:
+        # Threads don't survive fork, so each worker process starts its own loop
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(
+                target=_loop.run_forever,
+                name="celery-async-loop",
+                daemon=True,
+            ).start()
+        loop = _loop
+
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+_sync_redis: Optional[redis.Redis] = None
+
+
+def get_sync_redis() -> redis.Redis:
+    """Get the shared sync Redis client for Celery tasks."""
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = redis.Redis(
+            connection_pool=redis.ConnectionPool.from_url(
+                settings.redis_url,
+                max_connections=32,
+                health_check_interval=30,
+            )
+        )
+    return _sync_redis
+
+
 # Worker initialization - load settings from database
 @worker_process_init.connect
 def init_worker_process(**kwargs):
@@ -94,19 +155,17 @@ def init_worker_process(**kwargs):
     Initialize ModelManager settings when worker process starts.
     This ensures Celery workers use database settings, not just environment variables.
     """
+    # Don't reuse database connections inherited from the parent process
+    from src.core.database import reset_sync_engine
+    reset_sync_engine()
+
     logger.info("Initializing ModelManager for Celery worker...")
 
     try:
         from src.core.model_manager import ModelManager
 
-        # Run async initialization in a new event loop
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(ModelManager.initialize())
-            logger.info("ModelManager initialized successfully for Celery worker")
-        finally:
-            loop.close()
+        run_async(ModelManager.initialize())
+        logger.info("ModelManager initialized successfully for Celery worker")
 
     except Exception as e:
         logger.error(f"Failed to initialize ModelManager for Celery worker: {e}")
@@ -114,4 +173,4 @@ def init_worker_process(**kwargs):
 
 
 # Export for task decorators
-__all__ = ["celery_app", "OllamaRateLimitedTask"]
+__all__ = ["celery_app", "OllamaRateLimitedTask", "get_sync_redis", "run_async"]
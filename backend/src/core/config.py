@@ -3,7 +3,7 @@ Application configuration using Pydantic Settings.
 Loads configuration from environment variables.
 """
 from functools import lru_cache
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -39,6 +39,7 @@ class Settings(BaseSettings):
     neo4j_uri: str = Field(default="bolt://localhost:7687")
     neo4j_user: str = Field(default="neo4j")
     neo4j_password: str = Field(default="password")
+    neo4j_max_connection_pool_size: int = Field(default=50)
 
     # ==========================================================================
     # Qdrant Vector Database
@@ -159,6 +160,20 @@ class Settings(BaseSettings):
         default=1000,
         description="Maximum requests per hour per client",
     )
+    rate_limit_local_workers: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "Worker processes sharing the limit; when set, each worker lets a "
+            "client through locally for its 1/N share of the per-minute limit "
+            "(capped by the hourly limit / 60) and reports to Redis once that "
+            "share is pending or every few seconds (0 disables)"
+        ),
+    )
+    rate_limit_strategy: Literal["fixed", "approximate"] = Field(
+        default="fixed",
+        description="Rate limit window: 'fixed' or 'approximate' (sliding)",
+    )
 
     # ==========================================================================
     # Document Processing
@@ -166,6 +181,14 @@ class Settings(BaseSettings):
     chunk_size: int = Field(default=500)
     chunk_overlap: int = Field(default=100)
     max_concurrent_llm_requests: int = Field(default=4)
+    llm_requests_per_minute: int = Field(
+        default=60,
+        description="Maximum LLM extraction requests per minute across workers",
+    )
+    llm_tokens_per_minute: int = Field(
+        default=60000,
+        description="Maximum estimated LLM input tokens per minute across workers",
+    )
 
     # ==========================================================================
     # Validators
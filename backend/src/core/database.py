@@ -1,14 +1,16 @@
 """
 PostgreSQL database connection using SQLAlchemy async.
 """
-from typing import AsyncGenerator
+import threading
+from typing import AsyncGenerator, Optional
 
+from sqlalchemy import Engine, create_engine
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
 from src.core.config import settings
 
@@ -74,3 +76,58 @@ async def close_db() -> None:
     Called on application shutdown.
     """
     await engine.dispose()
+
+
+# =============================================================================
+# Sync engine for Celery workers
+# =============================================================================
+
+_sync_engine: Optional[Engine] = None
+_sync_session_maker: Optional[sessionmaker] = None
+_sync_engine_lock = threading.Lock()
+
+
+def get_sync_engine() -> Engine:
+    """
+    Get the process-wide sync engine, creating it on first use.
+
+    Celery tasks share this engine so they reuse one connection pool
+    instead of connecting to PostgreSQL on every task.
+    """
+    global _sync_engine, _sync_session_maker
+
+    if _sync_engine is None:
+        with _sync_engine_lock:
+            if _sync_engine is None:
+                # Convert async URL to sync
+                sync_url = settings.database_url.replace("+asyncpg", "")
+                _sync_engine = create_engine(
+                    sync_url,
+                    pool_pre_ping=True,
+                    pool_size=10,
+                    max_overflow=20,
+                    pool_recycle=1800,
+                )
+                _sync_session_maker = sessionmaker(_sync_engine)
+
+    return _sync_engine
+
+
+def get_sync_session() -> Session:
+    """Create a sync database session from the shared engine."""
+    get_sync_engine()
+    return _sync_session_maker()
+
+
+def reset_sync_engine() -> None:
+    """
+    Drop the sync engine inherited from a parent process.
+    Called in forked worker processes so pooled connections are not shared.
+    """
+    global _sync_engine, _sync_session_maker
+
+    with _sync_engine_lock:
+        if _sync_engine is not None:
+            _sync_engine.dispose(close=False)
+        _sync_engine = None
+        _sync_session_maker = None
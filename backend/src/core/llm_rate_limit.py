@@ -0,0 +1,129 @@
+"""
+Token bucket rate limiting for LLM requests, shared across workers via Redis.
+"""
+import logging
+import time
+from typing import Optional
+
+from src.core.celery_app import get_sync_redis
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Refill and consume a request bucket and a token bucket atomically.
+# Returns "0" when both were consumed, otherwise the seconds to wait.
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local rpm = tonumber(ARGV[2])
+local tpm = tonumber(ARGV[3])
+local cost = math.min(tonumber(ARGV[4]), tpm)
+
+local function level(key, capacity)
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    return math.min(capacity, tokens + math.max(0, now - ts) * capacity / 60)
+end
+
+local requests = level(KEYS[1], rpm)
+local tokens = level(KEYS[2], tpm)
+
+local wait = 0
+if requests < 1 then
+    wait = (1 - requests) * 60 / rpm
+end
+if tokens < cost then
+    wait = math.max(wait, (cost - tokens) * 60 / tpm)
+end
+if wait > 0 then
+    return tostring(wait)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', requests - 1, 'ts', now)
+redis.call('HSET', KEYS[2], 'tokens', tokens - cost, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 120)
+redis.call('EXPIRE', KEYS[2], 120)
+return '0'
+"""
+
+
+class LLMRateLimiter:
+    """
+    Proactive limiter for LLM calls on two axes: requests and tokens per minute.
+
+    Callers block until both buckets have capacity instead of hitting an
+    overloaded LLM server and retrying.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 60,
+        tokens_per_minute: int = 60000,
+        prefix: str = "llm_rate_limit",
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.prefix = prefix
+        self._script = None
+
+    def _get_script(self):
+        """Get the acquire script, registered on the shared sync Redis client."""
+        if self._script is None:
+            self._script = get_sync_redis().register_script(_ACQUIRE_SCRIPT)
+        return self._script
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Block until one request and the given tokens can be spent.
+
+        Requests larger than the per-minute token budget wait for a full bucket.
+        If Redis is unavailable the call is allowed through.
+
+        Args:
+            tokens: Estimated tokens for the request
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        keys = [f"{self.prefix}:requests", f"{self.prefix}:tokens"]
+
+        while True:
+            try:
+                wait = float(
+                    self._get_script()(
+                        keys=keys,
+                        args=[
+                            time.time(),
+                            self.requests_per_minute,
+                            self.tokens_per_minute,
+                            tokens,
+                        ],
+                    )
+                )
+            except Exception as e:
+                logger.warning(f"LLM rate limit check failed: {e}")
+                return waited
+
+            if wait <= 0:
+                if waited:
+                    logger.info(f"LLM request delayed {waited:.1f}s by rate limit")
+                return waited
+
+            time.sleep(wait)
+            waited += wait
+
+
+_llm_rate_limiter: Optional[LLMRateLimiter] = None
+
+
+def get_llm_rate_limiter() -> LLMRateLimiter:
+    """Get or create the LLM rate limiter instance."""
+    global _llm_rate_limiter
+    if _llm_rate_limiter is None:
+        _llm_rate_limiter = LLMRateLimiter(
+            requests_per_minute=settings.llm_requests_per_minute,
+            tokens_per_minute=settings.llm_tokens_per_minute,
+        )
+    return _llm_rate_limiter
@@ -0,0 +1,136 @@
+"""
+In-process token buckets used to pre-filter rate limit checks.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalTokenBucket:
+    """
+    Token bucket for one client within one worker process.
+
+    Tracks how many requests it let through since they were last reported,
+    so the shared Redis counters can be brought up to date on the next
+    authoritative check. A report is due once a full share is pending or
+    the flush interval has passed, even if tokens are left, so a client
+    that stays within its share still reaches Redis regularly.
+    """
+
+    def __init__(self, capacity: int, period: float = 60.0, flush_interval: float = 5.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.flush_interval = flush_interval
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.reported_at = self.updated_at
+        self.blocked_until = 0.0
+        self.pending = 0
+
+    def try_consume(self, now: float) -> bool:
+        """
+        Take one token if available, refilling for the time elapsed.
+
+        Returns False without taking a token when a report to Redis is due.
+        """
+        if self.pending and (
+            self.pending >= self.capacity
+            or now - self.reported_at >= self.flush_interval
+        ):
+            return False
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self.pending += 1
+        return True
+
+    def take_pending(self, now: float) -> int:
+        """Get and reset the count of locally allowed, unreported requests."""
+        pending, self.pending = self.pending, 0
+        self.reported_at = now
+        return pending
+
+
+class LocalBucketCache:
+    """
+    Per-client token buckets for one worker process, least recently used first.
+
+    Each bucket holds this worker's share of a client's per-minute limit.
+    Requests within the share skip Redis until a report is due. A client
+    denied by Redis is denied locally until its retry time passes.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        max_clients: int = 10000,
+        flush_interval: float = 5.0,
+    ):
+        self.capacity = capacity
+        self.max_clients = max_clients
+        self.flush_interval = flush_interval
+        self._buckets: OrderedDict[str, LocalTokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self) -> None:
+        """
+        Drop the least recently used bucket that holds no state.
+
+        Buckets with unreported requests or an active block are skipped,
+        since dropping them would lose counts Redis never saw or let a
+        denied client straight back in. If every bucket holds state, the
+        oldest is dropped anyway to keep memory bounded.
+        """
+        now = time.monotonic()
+        for client_id, bucket in self._buckets.items():
+            if not bucket.pending and bucket.blocked_until <= now:
+                del self._buckets[client_id]
+                return
+        self._buckets.popitem(last=False)
+
+    def _get(self, client_id: str) -> LocalTokenBucket:
+        """Get the client's bucket, creating it and evicting one if full."""
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            if len(self._buckets) >= self.max_clients:
+                self._evict()
+            bucket = LocalTokenBucket(
+                self.capacity, flush_interval=self.flush_interval
+            )
+            self._buckets[client_id] = bucket
+        else:
+            self._buckets.move_to_end(client_id)
+        return bucket
+
+    def try_consume(self, client_id: str) -> tuple[bool, float, int]:
+        """
+        Try to allow a request without consulting Redis.
+
+        Args:
+            client_id: Client identifier
+
+        Returns:
+            Tuple of (allowed_locally, seconds_blocked, tokens_left). The
+            first two are falsy when Redis must decide.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._get(client_id)
+            if bucket.blocked_until > now:
+                return False, bucket.blocked_until - now, 0
+            allowed = bucket.try_consume(now)
+            return allowed, 0.0, int(bucket.tokens)
+
+    def take_pending(self, client_id: str) -> int:
+        """Get and reset the client's locally allowed, unreported requests."""
+        with self._lock:
+            return self._get(client_id).take_pending(time.monotonic())
+
+    def block(self, client_id: str, seconds: int) -> None:
+        """Deny the client locally for the given number of seconds."""
+        with self._lock:
+            self._get(client_id).blocked_until = time.monotonic() + seconds
@@ -1,62 +1,218 @@
 """
 API rate limiting using Redis.
 """
+import hashlib
 import logging
+import math
+import re
 import time
-from typing import Optional
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional
 
 from fastapi import Request, HTTPException, status
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import JSONResponse, Response
+from redis.exceptions import NoScriptError
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from src.core.local_bucket import LocalBucketCache
 from src.core.redis import RedisClient
 from src.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+MINUTE_MS = 60_000
+HOUR_MS = 3_600_000
+
+# Fixed windows for the current minute and hour, one counter each.
+# Each check adds ARGV[4] requests: this one plus any a local pre-filter let
+# through since the last check. A counter gets its expiry only when it is
+# created. When the minute limit is already exceeded, the hour counts only
+# the requests the pre-filter already served, not this one.
+# Returns {minute_count, hour_count} after this check.
+_FIXED_WINDOW_SCRIPT = """
+local cost = tonumber(ARGV[4])
+
+local function hit(key, window, amount)
+    local count = redis.call('INCRBY', key, amount)
+    if count == amount then
+        redis.call('PEXPIRE', key, window)
+    end
+    return count
+end
+
+local minute_count = hit(KEYS[1], ARGV[1], cost)
+if minute_count > tonumber(ARGV[2]) then
+    if cost > 1 then
+        return {minute_count, hit(KEYS[2], ARGV[3], cost - 1)}
+    end
+    return {minute_count, tonumber(redis.call('GET', KEYS[2]) or '0')}
+end
+return {minute_count, hit(KEYS[2], ARGV[3], cost)}
+"""
+
+# Approximate sliding windows from the previous and current fixed windows:
+# count = previous * (1 - elapsed fraction of current window) + current.
+# ARGV[6] is the number of requests to add, as in the fixed window script.
+# When either window lacks room for this request, only the requests a local
+# pre-filter already let through are added. Current counters live for two
+# windows so they can serve as the next window's previous.
+# Returns {allowed, minute_count, hour_count} with the weighted counts
+# before this check, rounded down.
+_APPROXIMATE_SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local minute_window = tonumber(ARGV[2])
+local minute_limit = tonumber(ARGV[3])
+local hour_window = tonumber(ARGV[4])
+local hour_limit = tonumber(ARGV[5])
+local cost = tonumber(ARGV[6])
+
+local function weighted(previous_key, current_key, window)
+    local elapsed = (now % window) / window
+    local previous = tonumber(redis.call('GET', previous_key) or '0')
+    local current = tonumber(redis.call('GET', current_key) or '0')
+    return previous * (1 - elapsed) + current
+end
+
+local function hit(key, window, amount)
+    if amount > 0 and redis.call('INCRBY', key, amount) == amount then
+        redis.call('PEXPIRE', key, window * 2)
+    end
+end
+
+local minute_count = weighted(KEYS[1], KEYS[2], minute_window)
+local hour_count = weighted(KEYS[3], KEYS[4], hour_window)
+local allowed = 1
+
+if minute_count + cost > minute_limit or hour_count + cost > hour_limit then
+    allowed = 0
+    cost = cost - 1
+end
+
+hit(KEYS[2], minute_window, cost)
+hit(KEYS[4], hour_window, cost)
+return {allowed, math.floor(minute_count), math.floor(hour_count)}
+"""
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a rate limit check, with what is left in each window."""
+    allowed: bool
+    retry_after: Optional[int]
+    minute_remaining: int
+    hour_remaining: int
+
+
+RATE_LIMIT_EXCEEDED_DETAIL = "Rate limit exceeded. Please try again later."
+
+# The 429 body never changes, so it is serialized once
+_RATE_LIMIT_EXCEEDED_BODY = JSONResponse(
+    content={"detail": RATE_LIMIT_EXCEEDED_DETAIL}
+).body
+
+
+# Read-only Retry-After headers for common values, shared between responses
+_RETRY_AFTER_HEADERS = {
+    seconds: MappingProxyType({"Retry-After": str(seconds)})
+    for seconds in (15, 30, 60, 120, 300)
+}
+
+
+def _retry_after_headers(seconds: int) -> Mapping[str, str]:
+    """Get read-only Retry-After headers, cached for common values."""
+    headers = _RETRY_AFTER_HEADERS.get(seconds)
+    if headers is None:
+        headers = MappingProxyType({"Retry-After": str(seconds)})
+    return headers
+
+
 class RateLimitExceeded(HTTPException):
     """Rate limit exceeded exception."""
 
     def __init__(self, retry_after: int = 60):
         super().__init__(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Rate limit exceeded. Please try again later.",
-            headers={"Retry-After": str(retry_after)},
+            detail=RATE_LIMIT_EXCEEDED_DETAIL,
+            headers=_retry_after_headers(retry_after),
         )
 
 
 class RateLimiter:
-    """Token bucket rate limiter using Redis."""
+    """Fixed window rate limiter using Redis counters."""
+
+    _script = _FIXED_WINDOW_SCRIPT
 
     def __init__(
         self,
         requests_per_minute: int = 60,
         requests_per_hour: int = 1000,
         prefix: str = "rate_limit",
+        local_workers: int = 0,
     ):
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
         self.prefix = prefix
+        self._sha: Optional[str] = None
+        # Each worker's share of a client's per-minute rate is served
+        # in-process and reported to Redis in batches. The rate is capped by
+        # the hour limit spread over its minutes, so the hour is enforced too
+        self._local: Optional[LocalBucketCache] = None
+        if local_workers > 0:
+            rate = min(requests_per_minute, requests_per_hour // 60)
+            if rate >= local_workers:
+                self._local = LocalBucketCache(rate // local_workers)
 
     def _get_client_id(self, request: Request) -> str:
         """Get client identifier from request."""
         # Try to get user ID from auth header
         auth_header = request.headers.get("Authorization", "")
         if auth_header.startswith("Bearer "):
-            # Use hashed token as identifier for authenticated users
+            # Use hashed token as identifier for authenticated users. The
+            # hash must be stable across worker processes, which hash() is not
             token = auth_header[7:]
-            return f"user:{hash(token) % 10000000}"
+            digest = hashlib.blake2b(token.encode(), digest_size=8).hexdigest()
+            return f"user:{digest}"
 
         # Fall back to IP address for unauthenticated requests
         forwarded_for = request.headers.get("X-Forwarded-For")
         if forwarded_for:
-            client_ip = forwarded_for.split(",")[0].strip()
+            # The first entry is the original client; partition avoids
+            # building a list of every proxy hop
+            client_ip = forwarded_for.partition(",")[0].strip()
         else:
             client_ip = request.client.host if request.client else "unknown"
 
         return f"ip:{client_ip}"
 
+    def _window_keys(self, client_id: str, current_time: int) -> tuple[str, str]:
+        """
+        Get the current minute and hour window keys for a client.
+
+        The client id is a Redis Cluster hash tag, so all of a client's keys
+        share a slot and can be used together in one script call.
+        """
+        return (
+            f"{self.prefix}:{{{client_id}}}:minute:{current_time // 60}",
+            f"{self.prefix}:{{{client_id}}}:hour:{current_time // 3600}",
+        )
+
+    async def _run_script(self, redis, keys: list[str], args: list) -> list:
+        """
+        Run the limiter's script by SHA, loading it on first use.
+
+        The script is loaded again if Redis has dropped its script cache.
+        """
+        if self._sha is None:
+            self._sha = await redis.script_load(self._script)
+        try:
+            return await redis.evalsha(self._sha, len(keys), *keys, *args)
+        except NoScriptError:
+            self._sha = await redis.script_load(self._script)
+            return await redis.evalsha(self._sha, len(keys), *keys, *args)
+
     async def is_allowed(self, request: Request) -> tuple[bool, Optional[int]]:
         """
         Check if request is allowed.
@@ -64,44 +220,92 @@ class RateLimiter:
         Returns:
             Tuple of (is_allowed, retry_after_seconds)
         """
+        result = await self.check_and_report(request)
+        return result.allowed, result.retry_after
+
+    async def check_and_report(self, request: Request) -> RateLimitResult:
+        """
+        Check if request is allowed and report what is left in each window.
+
+        With a local pre-filter, requests within this worker's share skip
+        Redis until a full share is pending or the flush interval passes,
+        and clients Redis has denied are denied locally until their retry
+        time. Otherwise both windows are checked in a single atomic
+        script call, which also records the locally allowed requests and
+        returns the counts used for the remaining figures.
+
+        Returns:
+            Rate limit result for the request
+        """
         client_id = self._get_client_id(request)
-        current_time = int(time.time())
+        cost = 1
+
+        if self._local is not None:
+            allowed, blocked_for, tokens_left = self._local.try_consume(client_id)
+            if allowed:
+                # Only this worker's share is known without Redis
+                return RateLimitResult(
+                    True, None, tokens_left, self.requests_per_hour
+                )
+            if blocked_for:
+                return RateLimitResult(False, math.ceil(blocked_for), 0, 0)
+            cost += self._local.take_pending(client_id)
 
         try:
             redis = await RedisClient.get_client()
             if not redis:
                 # If Redis is unavailable, allow the request
                 logger.warning("Redis unavailable for rate limiting")
-                return True, None
+                return self._unlimited()
 
-            # Check minute limit
-            minute_key = f"{self.prefix}:{client_id}:minute:{current_time // 60}"
-            minute_count = await redis.incr(minute_key)
+            result = await self._check(redis, client_id, cost)
 
-            if minute_count == 1:
-                await redis.expire(minute_key, 60)
+        except Exception as e:
+            logger.error(f"Rate limit check failed: {e}")
+            # Allow request if rate limiting fails
+            return self._unlimited()
 
-            if minute_count > self.requests_per_minute:
-                retry_after = 60 - (current_time % 60)
-                return False, retry_after
+        if not result.allowed and self._local is not None:
+            self._local.block(client_id, result.retry_after)
+        return result
 
-            # Check hour limit
-            hour_key = f"{self.prefix}:{client_id}:hour:{current_time // 3600}"
-            hour_count = await redis.incr(hour_key)
+    def _unlimited(self) -> RateLimitResult:
+        """Result used when Redis cannot be consulted."""
+        return RateLimitResult(
+            True, None, self.requests_per_minute, self.requests_per_hour
+        )
 
-            if hour_count == 1:
-                await redis.expire(hour_key, 3600)
+    async def _check(self, redis, client_id: str, cost: int) -> RateLimitResult:
+        """
+        Count requests against the Redis windows.
 
-            if hour_count > self.requests_per_hour:
-                retry_after = 3600 - (current_time % 3600)
-                return False, retry_after
+        Args:
+            redis: Redis client
+            client_id: Client identifier
+            cost: Requests to record, including this one
 
-            return True, None
+        Returns:
+            Rate limit result for the request
+        """
+        current_time = int(time.time())
 
-        except Exception as e:
-            logger.error(f"Rate limit check failed: {e}")
-            # Allow request if rate limiting fails
-            return True, None
+        minute_count, hour_count = await self._run_script(
+            redis,
+            list(self._window_keys(client_id, current_time)),
+            [MINUTE_MS, self.requests_per_minute, HOUR_MS, cost],
+        )
+        minute_remaining = max(0, self.requests_per_minute - minute_count)
+        hour_remaining = max(0, self.requests_per_hour - hour_count)
+
+        if minute_count > self.requests_per_minute:
+            retry_after = 60 - (current_time % 60)
+            return RateLimitResult(False, retry_after, 0, hour_remaining)
+
+        if hour_count > self.requests_per_hour:
+            retry_after = 3600 - (current_time % 3600)
+            return RateLimitResult(False, retry_after, minute_remaining, 0)
+
+        return RateLimitResult(True, None, minute_remaining, hour_remaining)
 
     async def get_remaining(self, request: Request) -> dict:
         """Get remaining requests for client."""
@@ -116,11 +320,113 @@ class RateLimiter:
                     "hour_remaining": self.requests_per_hour,
                 }
 
-            minute_key = f"{self.prefix}:{client_id}:minute:{current_time // 60}"
-            hour_key = f"{self.prefix}:{client_id}:hour:{current_time // 3600}"
+            minute_count, hour_count = (
+                int(count or 0)
+                for count in await redis.mget(
+                    self._window_keys(client_id, current_time)
+                )
+            )
 
-            minute_count = int(await redis.get(minute_key) or 0)
-            hour_count = int(await redis.get(hour_key) or 0)
+            return {
+                "minute_remaining": max(0, self.requests_per_minute - minute_count),
+                "hour_remaining": max(0, self.requests_per_hour - hour_count),
+                "minute_limit": self.requests_per_minute,
+                "hour_limit": self.requests_per_hour,
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to get remaining: {e}")
+            return {
+                "minute_remaining": self.requests_per_minute,
+                "hour_remaining": self.requests_per_hour,
+            }
+
+
+class ApproximateSlidingWindowLimiter(RateLimiter):
+    """
+    Approximate sliding window rate limiter using Redis counters.
+
+    Weights the previous fixed window's count by how much of it still
+    overlaps the sliding window, which avoids the burst of up to twice the
+    limit that fixed windows allow at a boundary while keeping one counter
+    per window.
+    """
+
+    _script = _APPROXIMATE_SLIDING_WINDOW_SCRIPT
+
+    def _sliding_keys(self, client_id: str, current_time: int) -> list[str]:
+        """Get previous and current minute and hour window keys for a client."""
+        minute_key, hour_key = self._window_keys(client_id, current_time)
+        previous_minute_key, _ = self._window_keys(client_id, current_time - 60)
+        _, previous_hour_key = self._window_keys(client_id, current_time - 3600)
+        return [previous_minute_key, minute_key, previous_hour_key, hour_key]
+
+    async def _check(self, redis, client_id: str, cost: int) -> RateLimitResult:
+        """
+        Count requests against the weighted Redis windows.
+
+        Args:
+            redis: Redis client
+            client_id: Client identifier
+            cost: Requests to record, including this one
+
+        Returns:
+            Rate limit result for the request
+        """
+        now_ms = int(time.time() * 1000)
+        current_time = now_ms // 1000
+
+        allowed, minute_count, hour_count = await self._run_script(
+            redis,
+            self._sliding_keys(client_id, current_time),
+            [
+                now_ms,
+                MINUTE_MS,
+                self.requests_per_minute,
+                HOUR_MS,
+                self.requests_per_hour,
+                cost,
+            ],
+        )
+        # Counts are from before this check, which recorded `cost` requests
+        # when allowed and one fewer when not
+        recorded = cost if allowed else cost - 1
+        minute_remaining = max(0, self.requests_per_minute - minute_count - recorded)
+        hour_remaining = max(0, self.requests_per_hour - hour_count - recorded)
+
+        if not allowed:
+            # The weight of the previous window has decayed enough by the
+            # time the current window ends, so retry then
+            if minute_count + cost > self.requests_per_minute:
+                retry_after = 60 - (current_time % 60)
+                return RateLimitResult(False, retry_after, 0, hour_remaining)
+            retry_after = 3600 - (current_time % 3600)
+            return RateLimitResult(False, retry_after, minute_remaining, 0)
+
+        return RateLimitResult(True, None, minute_remaining, hour_remaining)
+
+    async def get_remaining(self, request: Request) -> dict:
+        """Get remaining requests for client."""
+        client_id = self._get_client_id(request)
+        now = time.time()
+        current_time = int(now)
+
+        try:
+            redis = await RedisClient.get_client()
+            if not redis:
+                return {
+                    "minute_remaining": self.requests_per_minute,
+                    "hour_remaining": self.requests_per_hour,
+                }
+
+            previous_minute, minute, previous_hour, hour = (
+                int(count or 0)
+                for count in await redis.mget(
+                    self._sliding_keys(client_id, current_time)
+                )
+            )
+            minute_count = int(previous_minute * (1 - (now % 60) / 60) + minute)
+            hour_count = int(previous_hour * (1 - (now % 3600) / 3600) + hour)
 
             return {
                 "minute_remaining": max(0, self.requests_per_minute - minute_count),
@@ -137,70 +443,165 @@ class RateLimiter:
             }
 
 
-# Default rate limiter instance
-_rate_limiter: Optional[RateLimiter] = None
+# Rate limiter classes by strategy name
+RATE_LIMIT_STRATEGIES: dict[str, type[RateLimiter]] = {
+    "fixed": RateLimiter,
+    "approximate": ApproximateSlidingWindowLimiter,
+}
+
+# Default rate limiter instances, one per strategy
+_rate_limiters: dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(strategy: Optional[str] = None) -> RateLimiter:
+    """
+    Get or create rate limiter instance.
 
+    Args:
+        strategy: Key of RATE_LIMIT_STRATEGIES; defaults to the configured one
 
-def get_rate_limiter() -> RateLimiter:
-    """Get or create rate limiter instance."""
-    global _rate_limiter
-    if _rate_limiter is None:
-        _rate_limiter = RateLimiter(
+    Returns:
+        Shared rate limiter for the strategy
+    """
+    strategy = strategy or settings.rate_limit_strategy
+    if strategy not in _rate_limiters:
+        _rate_limiters[strategy] = RATE_LIMIT_STRATEGIES[strategy](
             requests_per_minute=getattr(settings, 'rate_limit_per_minute', 60),
             requests_per_hour=getattr(settings, 'rate_limit_per_hour', 1000),
+            local_workers=settings.rate_limit_local_workers,
         )
-    return _rate_limiter
+    return _rate_limiters[strategy]
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware for rate limiting requests."""
+class RateLimitMiddleware:
+    """
+    ASGI middleware for rate limiting requests.
+
+    Implemented as a plain ASGI callable rather than on BaseHTTPMiddleware,
+    which runs every request in its own task group and streams the response
+    through an extra queue.
+    """
 
     # Paths to exclude from rate limiting
-    EXCLUDED_PATHS = {
+    EXCLUDED_PATHS = frozenset({
         "/",
         "/health",
         "/docs",
         "/redoc",
         "/openapi.json",
-    }
+    })
 
-    async def dispatch(self, request: Request, call_next):
-        # Skip rate limiting for excluded paths
-        if request.url.path in self.EXCLUDED_PATHS:
-            return await call_next(request)
+    # Path prefixes to exclude; each matches itself and any path below it
+    EXCLUDED_PREFIXES = (
+        "/api/v1/health",
+    )
 
-        # Skip rate limiting for health check endpoints
-        if request.url.path.endswith("/health"):
-            return await call_next(request)
+    def __init__(
+        self,
+        app: ASGIApp,
+        strategy: Optional[str] = None,
+        excluded_paths: Optional[Iterable[str]] = None,
+        excluded_prefixes: Optional[Iterable[str]] = None,
+        limiter: Optional[RateLimiter] = None,
+    ):
+        self.app = app
+        self.strategy = strategy
 
-        rate_limiter = get_rate_limiter()
-        is_allowed, retry_after = await rate_limiter.is_allowed(request)
+        # The limiter and its header value are resolved once, not per request
+        self._limiter = limiter or get_rate_limiter(strategy)
+        self._limit_header = str(self._limiter.requests_per_minute)
 
-        if not is_allowed:
-            logger.warning(
-                f"Rate limit exceeded for {request.url.path} - "
-                f"retry after {retry_after}s"
-            )
-            return JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content={"detail": "Rate limit exceeded. Please try again later."},
-                headers={"Retry-After": str(retry_after or 60)},
+        # Exclusions are compiled once: a set lookup for exact paths and a
+        # single regex for all prefixes
+        self._exact = frozenset(
+            self.EXCLUDED_PATHS if excluded_paths is None else excluded_paths
+        )
+        prefixes = list(
+            self.EXCLUDED_PREFIXES if excluded_prefixes is None else excluded_prefixes
+        )
+        self._prefix_re = None
+        if prefixes:
+            self._prefix_re = re.compile(
+                r"(?:" + "|".join(map(re.escape, prefixes)) + r")(?:/|$)"
             )
 
-        response = await call_next(request)
+    def _is_excluded(self, path: str) -> bool:
+        """Check if a path is exempt from rate limiting."""
+        if path in self._exact or path.endswith("/health"):
+            return True
+        return self._prefix_re is not None and self._prefix_re.match(path) is not None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        # Add rate limit headers
-        remaining = await rate_limiter.get_remaining(request)
-        response.headers["X-RateLimit-Limit-Minute"] = str(remaining.get("minute_limit", 60))
-        response.headers["X-RateLimit-Remaining-Minute"] = str(remaining.get("minute_remaining", 60))
+        path = scope["path"]
 
-        return response
+        # Skip rate limiting for excluded paths and health check endpoints
+        if self._is_excluded(path):
+            await self.app(scope, receive, send)
+            return
 
+        result = await self._limiter.check_and_report(Request(scope))
+
+        if not result.allowed:
+            logger.warning(
+                f"Rate limit exceeded for {path} - "
+                f"retry after {result.retry_after}s"
+            )
+            response = Response(
+                content=_RATE_LIMIT_EXCEEDED_BODY,
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers=_retry_after_headers(result.retry_after or 60),
+                media_type="application/json",
+            )
+            await response(scope, receive, send)
+            return
+
+        limit = self._limit_header
+        remaining = str(result.minute_remaining)
+
+        async def send_with_headers(message: Message) -> None:
+            # Add rate limit headers from the same check
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit-Minute"] = limit
+                headers["X-RateLimit-Remaining-Minute"] = remaining
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def setup_rate_limiting(
+    app,
+    enabled: bool = True,
+    strategy: Optional[str] = None,
+    excluded_paths: Optional[Iterable[str]] = None,
+    excluded_prefixes: Optional[Iterable[str]] = None,
+):
+    """
+    Setup rate limiting middleware.
+
+    Args:
+        app: FastAPI application
+        enabled: Whether to add the middleware
+        strategy: Key of RATE_LIMIT_STRATEGIES; defaults to the configured one
+        excluded_paths: Exact paths to exempt; defaults to
+            RateLimitMiddleware.EXCLUDED_PATHS
+        excluded_prefixes: Path prefixes to exempt; defaults to
+            RateLimitMiddleware.EXCLUDED_PREFIXES
+    """
+    if strategy is not None and strategy not in RATE_LIMIT_STRATEGIES:
+        raise ValueError(f"Unknown rate limit strategy: {strategy}")
 
-def setup_rate_limiting(app, enabled: bool = True):
-    """Setup rate limiting middleware."""
     if enabled:
-        app.add_middleware(RateLimitMiddleware)
+        app.add_middleware(
+            RateLimitMiddleware,
+            strategy=strategy,
+            excluded_paths=excluded_paths,
+            excluded_prefixes=excluded_prefixes,
+        )
         logger.info("Rate limiting middleware enabled")
     else:
         logger.info("Rate limiting middleware disabled")
@@ -6,7 +6,7 @@ from enum import Enum
 from typing import TYPE_CHECKING, Optional
 from uuid import uuid4
 
-from sqlalchemy import String, Text, Integer, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import String, Text, Integer, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -26,6 +26,13 @@ class ConversationSession(Base):
     """Chat conversation session."""
 
     __tablename__ = "conversation_sessions"
+    __table_args__ = (
+        # Per-chatbot and per-day range scans for stats aggregation
+        Index("idx_session_chatbot_created", "chatbot_id", "created_at"),
+        Index("idx_session_created", "created_at", "chatbot_id"),
+        # Batched expired-session cleanup
+        Index("idx_session_expires", "expires_at"),
+    )
 
     # Primary key
     id: Mapped[str] = mapped_column(
@@ -90,6 +97,37 @@ class Message(Base):
     """Chat message in a conversation."""
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # Per-chatbot stats aggregates without joining conversation_sessions
+        Index(
+            "idx_message_chatbot_created_role",
+            "chatbot_id",
+            "created_at",
+            "role",
+            postgresql_include=[
+                "response_time_ms",
+                "input_tokens",
+                "output_tokens",
+                "retrieval_count",
+                "retrieval_time_ms",
+            ],
+        ),
+        Index("idx_message_created_at", "created_at", postgresql_include=["session_id"]),
+        # Covers the per-session stats aggregates for index-only scans
+        Index(
+            "idx_message_session_created_role",
+            "session_id",
+            "created_at",
+            "role",
+            postgresql_include=[
+                "response_time_ms",
+                "input_tokens",
+                "output_tokens",
+                "retrieval_count",
+                "retrieval_time_ms",
+            ],
+        ),
+    )
 
     # Primary key
     id: Mapped[str] = mapped_column(
@@ -106,6 +144,13 @@ class Message(Base):
         index=True,
     )
 
+    # Denormalized from the session so stats can filter messages by chatbot
+    chatbot_id: Mapped[Optional[str]] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("chatbot_services.id", ondelete="CASCADE"),
+        nullable=True,
+    )
+
     # Fields
     role: Mapped[MessageRole] = mapped_column(
         SQLEnum(
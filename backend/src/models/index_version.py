@@ -4,9 +4,8 @@ IndexVersion SQLAlchemy model.
 from datetime import datetime
 from enum import Enum
 from typing import TYPE_CHECKING, Optional
-from uuid import uuid4
 
-from sqlalchemy import Integer, DateTime, ForeignKey, UniqueConstraint, Enum as SQLEnum
+from sqlalchemy import Integer, DateTime, ForeignKey, UniqueConstraint, Enum as SQLEnum, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -36,7 +35,7 @@ class IndexVersion(Base):
     id: Mapped[str] = mapped_column(
         UUID(as_uuid=False),
         primary_key=True,
-        default=lambda: str(uuid4()),
+        server_default=text("uuid_generate_v4()"),
     )
 
     # Foreign key
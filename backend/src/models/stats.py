@@ -3,9 +3,8 @@ ChatbotStats SQLAlchemy model.
 """
 from datetime import date
 from typing import TYPE_CHECKING, Optional
-from uuid import uuid4
 
-from sqlalchemy import Date, Integer, ForeignKey, UniqueConstraint
+from sqlalchemy import BigInteger, Date, Integer, ForeignKey, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -27,7 +26,7 @@ class ChatbotStats(Base):
     id: Mapped[str] = mapped_column(
         UUID(as_uuid=False),
         primary_key=True,
-        default=lambda: str(uuid4()),
+        server_default=text("uuid_generate_v4()"),
     )
 
     # Foreign key
@@ -81,6 +80,28 @@ class ChatbotStats(Base):
         nullable=True,
     )
 
+    # Running sums behind the averages, so incremental deltas can be added
+    response_time_sum_ms: Mapped[Optional[int]] = mapped_column(
+        BigInteger,
+        nullable=True,
+        default=0,
+    )
+    response_time_samples: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True,
+        default=0,
+    )
+    retrieval_time_sum_ms: Mapped[Optional[int]] = mapped_column(
+        BigInteger,
+        nullable=True,
+        default=0,
+    )
+    retrieval_time_samples: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True,
+        default=0,
+    )
+
     # Relationships
     chatbot: Mapped["ChatbotService"] = relationship(
         "ChatbotService",
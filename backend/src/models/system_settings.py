@@ -59,3 +59,4 @@ class SettingKeys:
     EMBEDDING_DIMENSION = "embedding_dimension"
     OLLAMA_BASE_URL = "ollama_base_url"
     TIMEZONE = "timezone"
+    STATS_AGGREGATED_UNTIL = "stats_aggregated_until"
@@ -211,8 +211,6 @@ class ChatService:
         Returns:
             Created session
         """
-        from src.services.stats_service import StatsService
-
         session = ConversationSession(
             id=str(uuid.uuid4()),
             chatbot_id=chatbot_id,
@@ -221,9 +219,6 @@ class ChatService:
         await db.commit()
         await db.refresh(session)
 
-        # Update daily stats - increment session count
-        await StatsService.increment_session_count(db, chatbot_id)
-
         return session
 
     @staticmethod
@@ -313,9 +308,12 @@ class ChatService:
         sanitized_content = sanitize_for_postgres(content) if content else content
         sanitized_sources = sanitize_for_postgres(sources) if sources else sources
 
+        session = await db.get(ConversationSession, session_id)
+
         message = Message(
             id=str(uuid.uuid4()),
             session_id=session_id,
+            chatbot_id=session.chatbot_id if session else None,
             role=role,
             content=sanitized_content,
             sources=sanitized_sources,
@@ -328,7 +326,6 @@ class ChatService:
         db.add(message)
 
         # Update session message_count
-        session = await db.get(ConversationSession, session_id)
         if session:
             session.message_count += 1
             session.extend_expiration()  # Keep session alive
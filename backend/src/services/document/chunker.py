@@ -1,7 +1,7 @@
 """
 Document chunking using LangChain text splitters.
 """
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
@@ -84,24 +84,26 @@ class DocumentChunker:
             for i, chunk in enumerate(chunks)
         ]
 
-    def chunk_pages(
+    def iter_page_chunks(
         self,
-        pages: list[dict],
+        pages: Iterable[dict],
         document_id: str,
         filename: str,
-    ) -> list[dict]:
+    ) -> Iterator[dict]:
         """
-        Chunk text from pages while preserving page information.
+        Lazily chunk a stream of pages, preserving page information.
+
+        Unlike chunk_pages, chunks are yielded as soon as their page is split,
+        so the total chunk_count is not included in the metadata.
 
         Args:
-            pages: List of page dicts with page_num and text
+            pages: Iterable of page dicts with page_num and text
             document_id: Document ID
             filename: Source filename
 
-        Returns:
-            List of chunks with page metadata
+        Yields:
+            Chunks with page metadata
         """
-        all_chunks = []
         chunk_index = 0
 
         for page in pages:
@@ -111,10 +113,8 @@ class DocumentChunker:
             if not page_text.strip():
                 continue
 
-            page_chunks = self.chunk_text(page_text)
-
-            for chunk in page_chunks:
-                all_chunks.append({
+            for chunk in self.chunk_text(page_text):
+                yield {
                     "text": chunk,
                     "metadata": {
                         "document_id": document_id,
@@ -122,9 +122,28 @@ class DocumentChunker:
                         "page_num": page_num,
                         "chunk_index": chunk_index,
                     },
-                })
+                }
                 chunk_index += 1
 
+    def chunk_pages(
+        self,
+        pages: list[dict],
+        document_id: str,
+        filename: str,
+    ) -> list[dict]:
+        """
+        Chunk text from pages while preserving page information.
+
+        Args:
+            pages: List of page dicts with page_num and text
+            document_id: Document ID
+            filename: Source filename
+
+        Returns:
+            List of chunks with page metadata
+        """
+        all_chunks = list(self.iter_page_chunks(pages, document_id, filename))
+
         # Add total chunk count to all chunks
         for chunk in all_chunks:
             chunk["metadata"]["chunk_count"] = len(all_chunks)
@@ -1,8 +1,11 @@
 """
 Document embedding and Qdrant storage service.
 """
+import asyncio
+import itertools
+import logging
 import uuid
-from typing import Optional
+from typing import Iterable, Optional
 
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
@@ -11,12 +14,16 @@ from qdrant_client.models import (
     PointStruct,
     Filter,
     FieldCondition,
+    FilterSelector,
     MatchValue,
+    Range,
 )
 
 from src.core.config import settings
 from src.core.embeddings import get_embedding_model, VECTOR_DIMENSION
 
+logger = logging.getLogger(__name__)
+
 
 class DocumentEmbedder:
     """Service for embedding documents and storing in Qdrant."""
@@ -89,22 +96,8 @@ class DocumentEmbedder:
             embeddings = self._embedding_model.embed_texts_sync(texts)
 
             # Create points
-            points = []
-            for j, (chunk, embedding) in enumerate(zip(batch, embeddings)):
-                point_id = str(uuid.uuid4())
-                point_ids.append(point_id)
-
-                metadata = chunk.get("metadata", {})
-                metadata["chatbot_id"] = chatbot_id
-                metadata["text"] = chunk["text"][:1000]  # Store truncated text for retrieval
-
-                points.append(
-                    PointStruct(
-                        id=point_id,
-                        vector=embedding,
-                        payload=metadata,
-                    )
-                )
+            points = self._build_points(batch, embeddings, chatbot_id)
+            point_ids.extend(str(point.id) for point in points)
 
             # Upsert to Qdrant
             self._client.upsert(
@@ -114,6 +107,111 @@ class DocumentEmbedder:
 
         return point_ids
 
+    def _build_points(
+        self,
+        batch: list[dict],
+        embeddings: list[list[float]],
+        chatbot_id: str,
+    ) -> list[PointStruct]:
+        """Build Qdrant points for a batch of chunks and their embeddings."""
+        points = []
+        for chunk, embedding in zip(batch, embeddings):
+            metadata = chunk.get("metadata", {})
+            metadata["chatbot_id"] = chatbot_id
+            metadata["text"] = chunk["text"][:1000]  # Store truncated text for retrieval
+
+            points.append(
+                PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector=embedding,
+                    payload=metadata,
+                )
+            )
+        return points
+
+    async def embed_and_store_concurrent(
+        self,
+        chunks: Iterable[dict],
+        chatbot_id: str,
+        batch_size: int = 64,
+        max_inflight: int = 4,
+        max_attempts: int = 3,
+    ) -> int:
+        """
+        Embed and store chunks from a lazy source with overlapping batches.
+
+        Up to max_inflight batches are embedded and upserted at once, so
+        embedding requests and Qdrant writes overlap. Chunks are only pulled
+        from the source when a slot is free, keeping memory bounded. Each
+        batch is retried on its own, so one failing batch doesn't discard
+        the others.
+
+        Args:
+            chunks: Iterable of chunk dicts with text and metadata
+            chatbot_id: Chatbot ID for filtering
+            batch_size: Chunks per embedding request
+            max_inflight: Maximum batches processed concurrently
+            max_attempts: Attempts per batch before giving up
+
+        Returns:
+            Number of stored points
+
+        Raises:
+            RuntimeError: If any batch still fails after max_attempts
+        """
+        semaphore = asyncio.Semaphore(max_inflight)
+        failures: list[Exception] = []
+
+        async def store_batch(batch: list[dict]) -> int:
+            try:
+                for attempt in range(1, max_attempts + 1):
+                    try:
+                        texts = [c["text"] for c in batch]
+                        embeddings = await self._embedding_model.embed_texts(texts)
+                        points = self._build_points(batch, embeddings, chatbot_id)
+                        await asyncio.to_thread(
+                            self._client.upsert,
+                            collection_name=self.collection_name,
+                            points=points,
+                        )
+                        return len(points)
+                    except Exception as e:
+                        if attempt == max_attempts:
+                            failures.append(e)
+                            return 0
+                        logger.warning(
+                            f"Embedding batch failed (attempt {attempt}/{max_attempts}): {e}"
+                        )
+            finally:
+                semaphore.release()
+
+        # The source may parse and chunk the document as it is iterated,
+        # so batches are pulled in a worker thread to keep that work off the
+        # event loop while earlier batches are in flight
+        source = iter(chunks)
+
+        def next_batch() -> list[dict]:
+            return list(itertools.islice(source, batch_size))
+
+        tasks = []
+        while True:
+            await semaphore.acquire()
+            batch = await asyncio.to_thread(next_batch)
+            if not batch:
+                semaphore.release()
+                break
+            tasks.append(asyncio.create_task(store_batch(batch)))
+
+        stored = sum(await asyncio.gather(*tasks))
+
+        if failures:
+            raise RuntimeError(
+                f"{len(failures)} embedding batch(es) failed after {max_attempts} "
+                f"attempts: {failures[0]}"
+            )
+
+        return stored
+
     def search(
         self,
         query: str,
@@ -166,6 +264,30 @@ class DocumentEmbedder:
             for result in results
         ]
 
+    def count_by_document(self, document_id: str) -> int:
+        """
+        Count stored chunks for a document.
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            Number of points for the document
+        """
+        result = self._client.count(
+            collection_name=self.collection_name,
+            count_filter=Filter(
+                must=[
+                    FieldCondition(
+                        key="document_id",
+                        match=MatchValue(value=document_id),
+                    )
+                ]
+            ),
+            exact=True,
+        )
+        return result.count
+
     def delete_by_document(self, document_id: str) -> int:
         """
         Delete all chunks for a document.
@@ -201,6 +323,34 @@ class DocumentEmbedder:
 
         return len(point_ids)
 
+    def delete_by_page_range(self, document_id: str, start_page: int, end_page: int) -> None:
+        """
+        Delete a document's chunks from a range of pages.
+
+        Args:
+            document_id: Document ID
+            start_page: Zero-based index of the first page
+            end_page: Zero-based index to stop before
+        """
+        # Chunk payloads carry one-based page numbers
+        self._client.delete(
+            collection_name=self.collection_name,
+            points_selector=FilterSelector(
+                filter=Filter(
+                    must=[
+                        FieldCondition(
+                            key="document_id",
+                            match=MatchValue(value=document_id),
+                        ),
+                        FieldCondition(
+                            key="page_num",
+                            range=Range(gte=start_page + 1, lte=end_page),
+                        ),
+                    ]
+                )
+            ),
+        )
+
     def delete_by_chatbot(self, chatbot_id: str) -> int:
         """
         Delete all chunks for a chatbot.
@@ -3,7 +3,7 @@ PDF document parser using pdfplumber.
 """
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 import pdfplumber
 
@@ -76,27 +76,46 @@ class PDFParser:
             logger.error(f"Error checking PDF: {e}")
             return True
 
-    def extract_pages(self) -> list[dict]:
+    def iter_pages(
+        self,
+        start_page: int = 0,
+        end_page: Optional[int] = None,
+    ) -> Iterator[dict]:
         """
-        Extract text with page information.
+        Lazily extract text page by page.
 
-        Returns:
-            List of dicts with page_num and text
-        """
-        pages = []
+        Each page's parsed layout is released once its text is extracted,
+        so memory stays bounded by a single page rather than the document.
 
+        Args:
+            start_page: Zero-based index of the first page to read
+            end_page: Zero-based index to stop before (defaults to the last page)
+
+        Yields:
+            Dicts with page_num, text, width and height (pages without text are skipped)
+        """
         with pdfplumber.open(self.file_path) as pdf:
-            for i, page in enumerate(pdf.pages, start=1):
+            pages = pdf.pages[start_page:end_page]
+            for i, page in enumerate(pages, start=start_page + 1):
                 page_text = page.extract_text()
+                page_info = {
+                    "page_num": i,
+                    "text": page_text,
+                    "width": page.width,
+                    "height": page.height,
+                }
+                page.close()
                 if page_text:
-                    pages.append({
-                        "page_num": i,
-                        "text": page_text,
-                        "width": page.width,
-                        "height": page.height,
-                    })
+                    yield page_info
 
-        return pages
+    def extract_pages(self) -> list[dict]:
+        """
+        Extract text with page information.
+
+        Returns:
+            List of dicts with page_num and text
+        """
+        return list(self.iter_pages())
 
     def get_metadata(self) -> dict:
         """
@@ -166,3 +185,36 @@ def extract_text_from_pdf(file_path: str | Path) -> str:
     """
     parser = PDFParser(file_path)
     return parser.extract_text()
+
+
+def iter_pdf_pages(
+    file_path: str | Path,
+    start_page: int = 0,
+    end_page: Optional[int] = None,
+) -> Iterator[dict]:
+    """
+    Stream text from PDF one page at a time.
+
+    Args:
+        file_path: Path to PDF file
+        start_page: Zero-based index of the first page to read
+        end_page: Zero-based index to stop before (defaults to the last page)
+
+    Yields:
+        Dicts with page_num and text for each page that has text
+    """
+    parser = PDFParser(file_path)
+    yield from parser.iter_pages(start_page, end_page)
+
+
+def get_pdf_page_count(file_path: str | Path) -> int:
+    """
+    Get the number of pages in a PDF.
+
+    Args:
+        file_path: Path to PDF file
+
+    Returns:
+        Page count
+    """
+    return PDFParser(file_path).get_metadata()["page_count"]
@@ -4,12 +4,38 @@ Entity extraction service using rule-based and LLM approaches.
 import logging
 import re
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 from src.core.config import settings
+from src.core.llm_rate_limit import get_llm_rate_limiter
+from src.core.token_counter import TokenCounter
 
 logger = logging.getLogger(__name__)
 
+# LLM extraction window size and overlap between neighbouring windows
+LLM_WINDOW_SIZE = 3000
+LLM_WINDOW_OVERLAP = 500
+
+
+def split_text_windows(text: str, window_size: int, overlap: int) -> list[str]:
+    """
+    Split text into overlapping windows.
+
+    Args:
+        text: Input text
+        window_size: Maximum characters per window
+        overlap: Characters shared by neighbouring windows
+
+    Returns:
+        List of text windows covering the whole text
+    """
+    if len(text) <= window_size:
+        return [text]
+
+    step = window_size - overlap
+    return [text[i : i + window_size] for i in range(0, len(text) - overlap, step)]
+
 
 class EntityExtractor:
     """
@@ -131,11 +157,17 @@ Rules:
 - CRITICAL LANGUAGE RULE: You MUST write entity names AND descriptions in the EXACT SAME language as the input text. If the input is Korean, write BOTH name and description in Korean. If the input is English, write BOTH in English. NEVER translate or mix languages. This is mandatory."""
 
         try:
+            user_message = f"Extract entities from:\n\n{text}"
+            get_llm_rate_limiter().acquire(
+                TokenCounter.estimate_tokens(system_prompt)
+                + TokenCounter.estimate_tokens(user_message)
+            )
+
             llm = self._get_llm()
             logger.info(f"Entity extraction using backend={settings.llm_backend}, model={llm.model}")
 
             response_text = llm.generate_sync(
-                user_message=f"Extract entities from:\n\n{text}",
+                user_message=user_message,
                 system_prompt=system_prompt,
             )
 
@@ -164,6 +196,36 @@ Rules:
             logger.error(f"LLM entity extraction error: {e}")
             return []
 
+    def extract_with_llm_windows(self, text: str) -> list[dict]:
+        """
+        Extract entities using LLM over overlapping windows of the text.
+
+        Windows are sent concurrently, capped at max_concurrent_llm_requests.
+
+        Args:
+            text: Input text
+
+        Returns:
+            List of extracted entities from all windows (may contain duplicates)
+        """
+        if not self.use_llm:
+            return []
+
+        windows = split_text_windows(text, LLM_WINDOW_SIZE, LLM_WINDOW_OVERLAP)
+        if len(windows) == 1:
+            return self.extract_with_llm(windows[0], max_length=LLM_WINDOW_SIZE)
+
+        # Create the LLM once before worker threads share it
+        self._get_llm()
+
+        max_workers = min(len(windows), settings.max_concurrent_llm_requests)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(
+                lambda window: self.extract_with_llm(window, max_length=LLM_WINDOW_SIZE),
+                windows,
+            )
+            return [entity for window_entities in results for entity in window_entities]
+
     def _parse_json_array(self, response: str) -> list:
         """
         Parse JSON array from LLM response, handling malformed responses.
@@ -257,7 +319,7 @@ Rules:
 
         # LLM extraction (comprehensive)
         if self.use_llm:
-            llm_entities = self.extract_with_llm(text)
+            llm_entities = self.extract_with_llm_windows(text)
             entities.extend(llm_entities)
 
         # Deduplicate by name (case-insensitive)
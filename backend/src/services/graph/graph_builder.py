@@ -50,6 +50,7 @@ class GraphBuilder:
             self._driver = AsyncGraphDatabase.driver(
                 settings.neo4j_uri,
                 auth=(settings.neo4j_user, settings.neo4j_password),
+                max_connection_pool_size=settings.neo4j_max_connection_pool_size,
             )
 
     async def close(self) -> None:
@@ -4,9 +4,17 @@ Relationship extraction service for knowledge graph construction.
 import logging
 import re
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 from src.core.config import settings
+from src.core.llm_rate_limit import get_llm_rate_limiter
+from src.core.token_counter import TokenCounter
+from src.services.graph.entity_extractor import (
+    LLM_WINDOW_OVERLAP,
+    LLM_WINDOW_SIZE,
+    split_text_windows,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -166,11 +174,17 @@ CRITICAL Rules:
 - IMPORTANT: Use entity names exactly as provided in the entity list. Do NOT translate names to other languages."""
 
         try:
+            user_message = f"Extract relationships from:\n\n{text}"
+            get_llm_rate_limiter().acquire(
+                TokenCounter.estimate_tokens(system_prompt)
+                + TokenCounter.estimate_tokens(user_message)
+            )
+
             llm = self._get_llm()
             logger.info(f"Relationship extraction using backend={settings.llm_backend}, model={llm.model}")
 
             response_text = llm.generate_sync(
-                user_message=f"Extract relationships from:\n\n{text}",
+                user_message=user_message,
                 system_prompt=system_prompt,
             )
 
@@ -281,6 +295,43 @@ CRITICAL Rules:
 
         return []
 
+    def extract_with_llm_windows(
+        self,
+        text: str,
+        entities: list[dict],
+    ) -> list[dict]:
+        """
+        Extract relationships using LLM over overlapping windows of the text.
+
+        Windows are sent concurrently, capped at max_concurrent_llm_requests.
+
+        Args:
+            text: Input text
+            entities: List of extracted entities
+
+        Returns:
+            List of relationships from all windows (may contain duplicates)
+        """
+        if not self.use_llm or not entities:
+            return []
+
+        windows = split_text_windows(text, LLM_WINDOW_SIZE, LLM_WINDOW_OVERLAP)
+        if len(windows) == 1:
+            return self.extract_with_llm(windows[0], entities, max_length=LLM_WINDOW_SIZE)
+
+        # Create the LLM once before worker threads share it
+        self._get_llm()
+
+        max_workers = min(len(windows), settings.max_concurrent_llm_requests)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(
+                lambda window: self.extract_with_llm(
+                    window, entities, max_length=LLM_WINDOW_SIZE
+                ),
+                windows,
+            )
+            return [rel for window_rels in results for rel in window_rels]
+
     def _parse_json_array(self, response: str) -> list:
         """
         Parse JSON array from LLM response, handling malformed responses.
@@ -372,7 +423,7 @@ CRITICAL Rules:
 
         # LLM extraction
         if self.use_llm:
-            llm_rels = self.extract_with_llm(text, entities)
+            llm_rels = self.extract_with_llm_windows(text, entities)
             relationships.extend(llm_rels)
 
         # Deduplicate
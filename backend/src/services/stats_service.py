@@ -2,19 +2,252 @@
 Statistics service for chatbot analytics.
 """
 import logging
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from typing import Optional
-from uuid import uuid4
 
-from sqlalchemy import select, func, and_
+from sqlalchemy import Select, select, func, and_, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.stats import ChatbotStats
 from src.models.conversation import ConversationSession, Message, MessageRole
 from src.models.chatbot_service import ChatbotService
+from src.models.system_settings import SystemSettings, SettingKeys
 
 logger = logging.getLogger(__name__)
 
+# Prebuilt statements for the per-increment path, bound at execute time
+_GET_STATS_STMT = select(ChatbotStats).where(
+    and_(
+        ChatbotStats.chatbot_id == bindparam("chatbot_id"),
+        ChatbotStats.date == bindparam("stats_date"),
+    )
+)
+
+
+def daily_session_counts_query(
+    chatbot_id: str,
+    range_start: datetime,
+    range_end: datetime,
+) -> Select:
+    """
+    Build a query counting a chatbot's sessions per day.
+
+    Args:
+        chatbot_id: Chatbot ID
+        range_start: Start of the first day
+        range_end: Start of the day after the last day
+
+    Returns:
+        Select yielding (date, session_count) rows
+    """
+    session_day = func.date(ConversationSession.created_at)
+    return (
+        select(session_day, func.count())
+        .where(
+            and_(
+                ConversationSession.chatbot_id == chatbot_id,
+                ConversationSession.created_at >= range_start,
+                ConversationSession.created_at < range_end,
+            )
+        )
+        .group_by(session_day)
+    )
+
+
+def stats_cursor_query() -> Select:
+    """
+    Build a query reading and locking the incremental aggregation cursor.
+
+    The cursor is the time up to which response and retrieval times have been
+    accumulated into ChatbotStats. Holding the row lock keeps recalculations
+    and the hourly aggregation from interleaving.
+
+    Returns:
+        Select yielding the cursor value, if set
+    """
+    return (
+        select(SystemSettings.value)
+        .where(SystemSettings.key == SettingKeys.STATS_AGGREGATED_UNTIL)
+        .with_for_update()
+    )
+
+
+def parse_stats_cursor(value: Optional[str]) -> Optional[datetime]:
+    """Parse a stored aggregation cursor; empty means never aggregated."""
+    return datetime.fromisoformat(value) if value else None
+
+
+def timing_stats_columns(timing_end: Optional[datetime] = None) -> list:
+    """
+    Build assistant response and retrieval time aggregates.
+
+    Averages are kept as (sum, samples) pairs so that later deltas can be
+    added on and the true mean recomputed.
+
+    Args:
+        timing_end: Only include messages created before this time
+
+    Returns:
+        Columns (response_time_sum, response_time_samples,
+        retrieval_time_sum, retrieval_time_samples)
+    """
+    timed = Message.role == MessageRole.ASSISTANT
+    if timing_end is not None:
+        timed = and_(timed, Message.created_at < timing_end)
+    return [
+        func.sum(Message.response_time_ms).filter(timed),
+        func.count(Message.response_time_ms).filter(timed),
+        func.sum(Message.retrieval_time_ms).filter(timed),
+        func.count(Message.retrieval_time_ms).filter(timed),
+    ]
+
+
+def message_stats_columns(timing_end: Optional[datetime] = None) -> list:
+    """
+    Build every message aggregate for a single pass over messages.
+
+    Assistant-only metrics use FILTER so every metric comes from the same scan.
+
+    Args:
+        timing_end: Only include messages created before this time in timings
+
+    Returns:
+        Columns (message_count, input_tokens, output_tokens, retrieval_count,
+        followed by timing_stats_columns)
+    """
+    is_assistant = Message.role == MessageRole.ASSISTANT
+    return [
+        func.count(),
+        func.sum(Message.input_tokens).filter(is_assistant),
+        func.sum(Message.output_tokens).filter(is_assistant),
+        func.sum(Message.retrieval_count).filter(is_assistant),
+        *timing_stats_columns(timing_end),
+    ]
+
+
+def daily_message_stats_query(
+    chatbot_id: str,
+    range_start: datetime,
+    range_end: datetime,
+    timing_end: Optional[datetime] = None,
+) -> Select:
+    """
+    Build a query aggregating a chatbot's messages per day in one pass.
+
+    Args:
+        chatbot_id: Chatbot ID
+        range_start: Start of the first day
+        range_end: Start of the day after the last day
+        timing_end: Only include messages created before this time in timings
+
+    Returns:
+        Select yielding (date, *message_stats_columns) rows
+    """
+    message_day = func.date(Message.created_at)
+    return (
+        select(message_day, *message_stats_columns(timing_end))
+        .where(
+            and_(
+                Message.chatbot_id == chatbot_id,
+                Message.created_at >= range_start,
+                Message.created_at < range_end,
+            )
+        )
+        .group_by(message_day)
+    )
+
+
+def timing_stats_values(timing_stats) -> dict:
+    """
+    Convert timing_stats_columns results into ChatbotStats column values.
+
+    Args:
+        timing_stats: (response_time_sum, response_time_samples,
+            retrieval_time_sum, retrieval_time_samples)
+
+    Returns:
+        Timing sums, sample counts and averages, keyed by column name
+    """
+    response_sum, response_samples, retrieval_sum, retrieval_samples = timing_stats
+    return {
+        "response_time_sum_ms": response_sum or 0,
+        "response_time_samples": response_samples or 0,
+        "avg_response_time_ms": int(response_sum // response_samples) if response_samples else None,
+        "retrieval_time_sum_ms": retrieval_sum or 0,
+        "retrieval_time_samples": retrieval_samples or 0,
+        "avg_retrieval_time_ms": int(retrieval_sum // retrieval_samples) if retrieval_samples else None,
+    }
+
+
+def build_stats_row(
+    chatbot_id: str,
+    stats_date: date,
+    session_count: int,
+    message_stats,
+) -> dict:
+    """
+    Build a ChatbotStats row from a session count and message_stats_columns results.
+
+    Args:
+        chatbot_id: Chatbot ID
+        stats_date: Date of the row
+        session_count: Sessions created that day
+        message_stats: message_stats_columns results, or None without messages
+
+    Returns:
+        ChatbotStats column values, keyed by column name
+    """
+    (
+        message_count,
+        input_tokens,
+        output_tokens,
+        retrieval_count,
+        *timing_stats,
+    ) = message_stats or (0, None, None, None, None, None, None, None)
+    return {
+        "chatbot_id": chatbot_id,
+        "date": stats_date,
+        "session_count": session_count,
+        "message_count": message_count,
+        "total_input_tokens": input_tokens or 0,
+        "total_output_tokens": output_tokens or 0,
+        "total_retrieval_count": retrieval_count or 0,
+        **timing_stats_values(timing_stats),
+    }
+
+
+def build_daily_stats_rows(
+    chatbot_id: str,
+    stats_dates: list[date],
+    session_rows,
+    message_rows,
+) -> list[dict]:
+    """
+    Combine per-day query results into ChatbotStats rows, one per date.
+
+    Args:
+        chatbot_id: Chatbot ID
+        stats_dates: Dates to produce rows for
+        session_rows: Rows from daily_session_counts_query
+        message_rows: Rows from daily_message_stats_query
+
+    Returns:
+        ChatbotStats column values, keyed by column name
+    """
+    session_counts = dict(session_rows)
+    message_stats = {row[0]: row[1:] for row in message_rows}
+
+    return [
+        build_stats_row(
+            chatbot_id,
+            stats_date,
+            session_counts.get(stats_date, 0),
+            message_stats.get(stats_date),
+        )
+        for stats_date in stats_dates
+    ]
+
 
 class StatsService:
     """Service for managing chatbot statistics."""
@@ -36,33 +269,72 @@ class StatsService:
         Returns:
             ChatbotStats record
         """
-        # Try to find existing
+        # Insert the row unless it already exists, returning it in one round-trip
         result = await db.execute(
-            select(ChatbotStats).where(
-                and_(
-                    ChatbotStats.chatbot_id == chatbot_id,
-                    ChatbotStats.date == stats_date,
-                )
+            pg_insert(ChatbotStats)
+            .values(
+                chatbot_id=chatbot_id,
+                date=stats_date,
+                session_count=0,
+                message_count=0,
+                avg_response_time_ms=None,
             )
+            .on_conflict_do_nothing(index_elements=["chatbot_id", "date"])
+            .returning(ChatbotStats)
         )
         stats = result.scalar_one_or_none()
 
         if stats:
+            await db.commit()
             return stats
 
-        # Create new
-        stats = ChatbotStats(
-            id=str(uuid4()),
+        # Row already existed
+        result = await db.execute(
+            _GET_STATS_STMT,
+            {"chatbot_id": chatbot_id, "stats_date": stats_date},
+        )
+        return result.scalar_one()
+
+    @staticmethod
+    async def _increment_daily_stats(
+        db: AsyncSession,
+        chatbot_id: str,
+        stats_date: Optional[date],
+        **deltas: int,
+    ) -> ChatbotStats:
+        """
+        Add to daily stats counters with a single upsert statement.
+
+        The row is created if missing and the counters are added in SQL, so
+        there is no read-modify-write through the ORM and concurrent requests
+        cannot lose each other's increments.
+
+        Args:
+            db: Database session
+            chatbot_id: Chatbot ID
+            stats_date: Date for stats (defaults to today, UTC)
+            **deltas: Amount to add, keyed by counter column name
+
+        Returns:
+            Updated ChatbotStats
+        """
+        stmt = pg_insert(ChatbotStats).values(
             chatbot_id=chatbot_id,
-            date=stats_date,
-            session_count=0,
-            message_count=0,
-            avg_response_time_ms=None,
+            date=stats_date or datetime.utcnow().date(),
+            **deltas,
         )
-        db.add(stats)
-        await db.commit()
-        await db.refresh(stats)
+        table = ChatbotStats.__table__
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["chatbot_id", "date"],
+            set_={
+                column: func.coalesce(table.c[column], 0) + stmt.excluded[column]
+                for column in deltas
+            },
+        ).returning(ChatbotStats)
 
+        result = await db.execute(stmt.execution_options(populate_existing=True))
+        stats = result.scalar_one()
+        await db.commit()
         return stats
 
     @staticmethod
@@ -77,17 +349,14 @@ class StatsService:
         Args:
             db: Database session
             chatbot_id: Chatbot ID
-            stats_date: Date for stats (defaults to today)
+            stats_date: Date for stats (defaults to today, UTC)
 
         Returns:
             Updated ChatbotStats
         """
-        stats_date = stats_date or date.today()
-        stats = await StatsService.get_or_create_daily_stats(db, chatbot_id, stats_date)
-        stats.session_count += 1
-        await db.commit()
-        await db.refresh(stats)
-        return stats
+        return await StatsService._increment_daily_stats(
+            db, chatbot_id, stats_date, session_count=1
+        )
 
     @staticmethod
     async def increment_message_count(
@@ -103,17 +372,14 @@ class StatsService:
             db: Database session
             chatbot_id: Chatbot ID
             count: Number of messages to add
-            stats_date: Date for stats (defaults to today)
+            stats_date: Date for stats (defaults to today, UTC)
 
         Returns:
             Updated ChatbotStats
         """
-        stats_date = stats_date or date.today()
-        stats = await StatsService.get_or_create_daily_stats(db, chatbot_id, stats_date)
-        stats.message_count += count
-        await db.commit()
-        await db.refresh(stats)
-        return stats
+        return await StatsService._increment_daily_stats(
+            db, chatbot_id, stats_date, message_count=count
+        )
 
     @staticmethod
     async def increment_token_count(
@@ -133,29 +399,19 @@ class StatsService:
             input_tokens: Number of input tokens to add
             output_tokens: Number of output tokens to add
             retrieval_count: Number of retrievals to add
-            stats_date: Date for stats (defaults to today)
+            stats_date: Date for stats (defaults to today, UTC)
 
         Returns:
             Updated ChatbotStats
         """
-        stats_date = stats_date or date.today()
-        stats = await StatsService.get_or_create_daily_stats(db, chatbot_id, stats_date)
-
-        # Initialize if None
-        if stats.total_input_tokens is None:
-            stats.total_input_tokens = 0
-        if stats.total_output_tokens is None:
-            stats.total_output_tokens = 0
-        if stats.total_retrieval_count is None:
-            stats.total_retrieval_count = 0
-
-        stats.total_input_tokens += input_tokens
-        stats.total_output_tokens += output_tokens
-        stats.total_retrieval_count += retrieval_count
-
-        await db.commit()
-        await db.refresh(stats)
-        return stats
+        return await StatsService._increment_daily_stats(
+            db,
+            chatbot_id,
+            stats_date,
+            total_input_tokens=input_tokens,
+            total_output_tokens=output_tokens,
+            total_retrieval_count=retrieval_count,
+        )
 
     @staticmethod
     async def get_stats_range(
@@ -206,7 +462,7 @@ class StatsService:
         Returns:
             Summary statistics dict
         """
-        end_date = date.today()
+        end_date = datetime.utcnow().date()
         start_date = end_date - timedelta(days=days - 1)
 
         # Get stats for the period
@@ -286,10 +542,9 @@ class StatsService:
         # Get all response times for percentile calculation
         response_times_result = await db.execute(
             select(Message.response_time_ms)
-            .join(ConversationSession, Message.session_id == ConversationSession.id)
             .where(
                 and_(
-                    ConversationSession.chatbot_id == chatbot_id,
+                    Message.chatbot_id == chatbot_id,
                     Message.created_at >= start_date,
                     Message.created_at <= end_date,
                     Message.role == MessageRole.ASSISTANT,
@@ -321,10 +576,9 @@ class StatsService:
                 func.sum(Message.output_tokens),
                 func.count(Message.id),
             )
-            .join(ConversationSession, Message.session_id == ConversationSession.id)
             .where(
                 and_(
-                    ConversationSession.chatbot_id == chatbot_id,
+                    Message.chatbot_id == chatbot_id,
                     Message.created_at >= start_date,
                     Message.created_at <= end_date,
                     Message.role == MessageRole.ASSISTANT,
@@ -347,10 +601,9 @@ class StatsService:
                 func.avg(Message.retrieval_count),
                 func.avg(Message.retrieval_time_ms),
             )
-            .join(ConversationSession, Message.session_id == ConversationSession.id)
             .where(
                 and_(
-                    ConversationSession.chatbot_id == chatbot_id,
+                    Message.chatbot_id == chatbot_id,
                     Message.created_at >= start_date,
                     Message.created_at <= end_date,
                     Message.role == MessageRole.ASSISTANT,
@@ -367,10 +620,9 @@ class StatsService:
                 func.date(Message.created_at).label("date"),
                 func.avg(Message.response_time_ms).label("avg_ms"),
             )
-            .join(ConversationSession, Message.session_id == ConversationSession.id)
             .where(
                 and_(
-                    ConversationSession.chatbot_id == chatbot_id,
+                    Message.chatbot_id == chatbot_id,
                     Message.created_at >= start_date,
                     Message.created_at <= end_date,
                     Message.role == MessageRole.ASSISTANT,
@@ -403,128 +655,95 @@ class StatsService:
         }
 
     @staticmethod
-    async def calculate_daily_stats(
+    async def _compute_daily_rows(
         db: AsyncSession,
         chatbot_id: str,
-        stats_date: date,
-    ) -> ChatbotStats:
+        stats_dates: list[date],
+    ) -> list[dict]:
         """
-        Calculate and update daily stats from conversation data.
+        Compute stats for consecutive days from conversation data.
+
+        Counts cover everything up to now. Timings stop at the incremental
+        aggregation cursor, since later messages are added by the next
+        aggregation run.
 
         Args:
             db: Database session
             chatbot_id: Chatbot ID
-            stats_date: Date to calculate stats for
+            stats_dates: Consecutive dates to calculate stats for
 
         Returns:
-            Updated ChatbotStats
+            ChatbotStats column values, keyed by column name
         """
-        # Calculate date boundaries
-        start_of_day = datetime.combine(stats_date, datetime.min.time())
-        end_of_day = datetime.combine(stats_date, datetime.max.time())
-
-        # Count sessions
-        session_result = await db.execute(
-            select(func.count())
-            .select_from(ConversationSession)
-            .where(
-                and_(
-                    ConversationSession.chatbot_id == chatbot_id,
-                    ConversationSession.created_at >= start_of_day,
-                    ConversationSession.created_at <= end_of_day,
-                )
-            )
-        )
-        session_count = session_result.scalar() or 0
+        range_start = datetime.combine(min(stats_dates), time.min)
+        range_end = datetime.combine(max(stats_dates) + timedelta(days=1), time.min)
+        timing_end = parse_stats_cursor(await db.scalar(stats_cursor_query()))
 
-        # Count messages for this chatbot on this day
-        message_result = await db.execute(
-            select(func.count())
-            .select_from(Message)
-            .join(ConversationSession, Message.session_id == ConversationSession.id)
-            .where(
-                and_(
-                    ConversationSession.chatbot_id == chatbot_id,
-                    Message.created_at >= start_of_day,
-                    Message.created_at <= end_of_day,
-                )
-            )
+        # Aggregate the whole range grouped by day instead of querying each day
+        session_rows = await db.execute(
+            daily_session_counts_query(chatbot_id, range_start, range_end)
         )
-        message_count = message_result.scalar() or 0
-
-        # Calculate average response time from assistant messages
-        response_time_result = await db.execute(
-            select(func.avg(Message.response_time_ms))
-            .join(ConversationSession, Message.session_id == ConversationSession.id)
-            .where(
-                and_(
-                    ConversationSession.chatbot_id == chatbot_id,
-                    Message.created_at >= start_of_day,
-                    Message.created_at <= end_of_day,
-                    Message.role == MessageRole.ASSISTANT,
-                    Message.response_time_ms.isnot(None),
-                )
-            )
+        message_rows = await db.execute(
+            daily_message_stats_query(chatbot_id, range_start, range_end, timing_end)
         )
-        avg_response_time = response_time_result.scalar()
-
-        # Calculate token totals
-        token_result = await db.execute(
-            select(
-                func.sum(Message.input_tokens),
-                func.sum(Message.output_tokens),
-            )
-            .join(ConversationSession, Message.session_id == ConversationSession.id)
-            .where(
-                and_(
-                    ConversationSession.chatbot_id == chatbot_id,
-                    Message.created_at >= start_of_day,
-                    Message.created_at <= end_of_day,
-                    Message.role == MessageRole.ASSISTANT,
-                )
-            )
+        return build_daily_stats_rows(
+            chatbot_id, stats_dates, session_rows.all(), message_rows.all()
         )
-        token_row = token_result.one()
-        total_input_tokens = token_row[0] or 0
-        total_output_tokens = token_row[1] or 0
 
-        # Calculate retrieval metrics
-        retrieval_result = await db.execute(
-            select(
-                func.sum(Message.retrieval_count),
-                func.avg(Message.retrieval_time_ms),
-            )
-            .join(ConversationSession, Message.session_id == ConversationSession.id)
-            .where(
-                and_(
-                    ConversationSession.chatbot_id == chatbot_id,
-                    Message.created_at >= start_of_day,
-                    Message.created_at <= end_of_day,
-                    Message.role == MessageRole.ASSISTANT,
-                )
-            )
-        )
-        retrieval_row = retrieval_result.one()
-        total_retrieval_count = retrieval_row[0] or 0
-        avg_retrieval_time = retrieval_row[1]
-
-        # Get or create stats record
-        stats = await StatsService.get_or_create_daily_stats(db, chatbot_id, stats_date)
-        stats.session_count = session_count
-        stats.message_count = message_count
-        stats.avg_response_time_ms = int(avg_response_time) if avg_response_time else None
-        stats.total_input_tokens = total_input_tokens
-        stats.total_output_tokens = total_output_tokens
-        stats.total_retrieval_count = total_retrieval_count
-        stats.avg_retrieval_time_ms = int(avg_retrieval_time) if avg_retrieval_time else None
+    @staticmethod
+    async def _upsert_daily_rows(
+        db: AsyncSession,
+        rows: list[dict],
+    ) -> list[ChatbotStats]:
+        """
+        Insert or overwrite daily stats rows in a single statement.
+
+        Args:
+            db: Database session
+            rows: ChatbotStats column values, keyed by column name
+
+        Returns:
+            Upserted ChatbotStats records
+        """
+        stmt = pg_insert(ChatbotStats).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["chatbot_id", "date"],
+            set_={
+                column: stmt.excluded[column]
+                for column in rows[0]
+                if column not in ("chatbot_id", "date")
+            },
+        ).returning(ChatbotStats)
+
+        result = await db.execute(stmt.execution_options(populate_existing=True))
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def calculate_daily_stats(
+        db: AsyncSession,
+        chatbot_id: str,
+        stats_date: date,
+    ) -> ChatbotStats:
+        """
+        Calculate and update daily stats from conversation data.
 
+        Args:
+            db: Database session
+            chatbot_id: Chatbot ID
+            stats_date: Date to calculate stats for
+
+        Returns:
+            Updated ChatbotStats
+        """
+        row = (await StatsService._compute_daily_rows(db, chatbot_id, [stats_date]))[0]
+        stats = (await StatsService._upsert_daily_rows(db, [row]))[0]
         await db.commit()
-        await db.refresh(stats)
 
         logger.info(
             f"Calculated stats for {chatbot_id} on {stats_date}: "
-            f"{session_count} sessions, {message_count} messages, "
-            f"avg_response={avg_response_time}ms, tokens={total_input_tokens}+{total_output_tokens}"
+            f"{row['session_count']} sessions, {row['message_count']} messages, "
+            f"avg_response={row['avg_response_time_ms']}ms, "
+            f"tokens={row['total_input_tokens']}+{row['total_output_tokens']}"
         )
 
         return stats
@@ -544,17 +763,17 @@ class StatsService:
             days: Number of days to recalculate
 
         Returns:
-            List of updated ChatbotStats
+            List of updated ChatbotStats, most recent first
         """
-        results = []
-        today = date.today()
+        today = datetime.utcnow().date()
+        stats_dates = [today - timedelta(days=i) for i in range(days)]
+        rows = await StatsService._compute_daily_rows(db, chatbot_id, stats_dates)
 
-        for i in range(days):
-            stats_date = today - timedelta(days=i)
-            stats = await StatsService.calculate_daily_stats(db, chatbot_id, stats_date)
-            results.append(stats)
+        # Write all days in one statement and one commit
+        results = await StatsService._upsert_daily_rows(db, rows)
+        await db.commit()
 
-        return results
+        return sorted(results, key=lambda stats: stats.date, reverse=True)
 
     @staticmethod
     async def get_all_chatbot_ids(db: AsyncSession) -> list[str]:
@@ -4,9 +4,9 @@ Version service for managing index versions.
 import logging
 from datetime import datetime
 from typing import Optional
-from uuid import uuid4
 
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, bindparam, delete, insert, literal
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.index_version import IndexVersion, VersionStatus
@@ -14,6 +14,26 @@ from src.models.chatbot_service import ChatbotService
 
 logger = logging.getLogger(__name__)
 
+# Attempts to allocate a version number before giving up on conflicts
+_CREATE_VERSION_ATTEMPTS = 3
+
+# Prebuilt statements for repeated lookups, bound at execute time
+_GET_VERSION_STMT = select(IndexVersion).where(
+    and_(
+        IndexVersion.chatbot_id == bindparam("chatbot_id"),
+        IndexVersion.version == bindparam("version"),
+    )
+)
+_GET_ACTIVE_STMT = select(IndexVersion).where(
+    and_(
+        IndexVersion.chatbot_id == bindparam("chatbot_id"),
+        IndexVersion.status == VersionStatus.ACTIVE,
+    )
+)
+_MAX_VERSION_STMT = select(func.max(IndexVersion.version)).where(
+    IndexVersion.chatbot_id == bindparam("chatbot_id")
+)
+
 
 class VersionService:
     """Service for managing chatbot index versions."""
@@ -58,12 +78,8 @@ class VersionService:
             IndexVersion or None
         """
         result = await db.execute(
-            select(IndexVersion).where(
-                and_(
-                    IndexVersion.chatbot_id == chatbot_id,
-                    IndexVersion.version == version,
-                )
-            )
+            _GET_VERSION_STMT,
+            {"chatbot_id": chatbot_id, "version": version},
         )
         return result.scalar_one_or_none()
 
@@ -83,12 +99,8 @@ class VersionService:
             Active IndexVersion or None
         """
         result = await db.execute(
-            select(IndexVersion).where(
-                and_(
-                    IndexVersion.chatbot_id == chatbot_id,
-                    IndexVersion.status == VersionStatus.ACTIVE,
-                )
-            )
+            _GET_ACTIVE_STMT,
+            {"chatbot_id": chatbot_id},
         )
         return result.scalar_one_or_none()
 
@@ -108,9 +120,8 @@ class VersionService:
             Next version number
         """
         result = await db.execute(
-            select(func.max(IndexVersion.version)).where(
-                IndexVersion.chatbot_id == chatbot_id
-            )
+            _MAX_VERSION_STMT,
+            {"chatbot_id": chatbot_id},
         )
         max_version = result.scalar()
         return (max_version or 0) + 1
@@ -132,21 +143,39 @@ class VersionService:
         Returns:
             Created IndexVersion
         """
-        version_number = await VersionService.get_next_version_number(db, chatbot_id)
-
-        version = IndexVersion(
-            id=str(uuid4()),
-            chatbot_id=chatbot_id,
-            version=version_number,
-            status=status,
-        )
-
-        db.add(version)
-        await db.commit()
-        await db.refresh(version)
+        # Compute MAX(version)+1 and insert in a single statement. A concurrent
+        # create can still claim the same number first; the unique constraint
+        # rejects it and we retry with a fresh MAX.
+        for attempt in range(1, _CREATE_VERSION_ATTEMPTS + 1):
+            next_version = select(
+                literal(chatbot_id, IndexVersion.chatbot_id.type),
+                func.coalesce(func.max(IndexVersion.version), 0) + 1,
+                literal(status, IndexVersion.status.type),
+                literal(datetime.utcnow(), IndexVersion.created_at.type),
+            ).where(IndexVersion.chatbot_id == chatbot_id)
+
+            try:
+                result = await db.execute(
+                    insert(IndexVersion)
+                    .from_select(
+                        ["chatbot_id", "version", "status", "created_at"],
+                        next_version,
+                    )
+                    .returning(IndexVersion)
+                )
+                version = result.scalar_one()
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                if attempt == _CREATE_VERSION_ATTEMPTS:
+                    raise
+                logger.warning(
+                    f"Version number conflict for chatbot {chatbot_id}, retrying"
+                )
+                continue
 
-        logger.info(f"Created version {version_number} for chatbot {chatbot_id}")
-        return version
+            logger.info(f"Created version {version.version} for chatbot {chatbot_id}")
+            return version
 
     @staticmethod
     async def update_status(
@@ -203,6 +232,8 @@ class VersionService:
         Returns:
             Activated IndexVersion or None
         """
+        now = datetime.utcnow()
+
         # Get the version to activate
         version_obj = await VersionService.get_version(db, chatbot_id, version)
 
@@ -223,7 +254,7 @@ class VersionService:
 
         # Activate the new version
         version_obj.status = VersionStatus.ACTIVE
-        version_obj.activated_at = datetime.utcnow()
+        version_obj.activated_at = now
 
         # Update chatbot's active_version
         chatbot_result = await db.execute(
@@ -277,18 +308,26 @@ class VersionService:
         Returns:
             True if deleted, False otherwise
         """
-        version_obj = await VersionService.get_version(db, chatbot_id, version)
-
-        if not version_obj:
-            return False
+        # Status check and delete in one statement, so a concurrent
+        # activation cannot slip in between them
+        result = await db.execute(
+            delete(IndexVersion)
+            .where(
+                and_(
+                    IndexVersion.chatbot_id == chatbot_id,
+                    IndexVersion.version == version,
+                    IndexVersion.status != VersionStatus.ACTIVE,
+                )
+            )
+            .returning(IndexVersion.id)
+        )
+        deleted_id = result.scalar_one_or_none()
+        await db.commit()
 
-        if version_obj.status == VersionStatus.ACTIVE:
-            logger.warning(f"Cannot delete active version {version}")
+        if deleted_id is None:
+            logger.warning(f"Version {version} not found or active, not deleted")
             return False
 
-        await db.delete(version_obj)
-        await db.commit()
-
         logger.info(f"Deleted version {version} for chatbot {chatbot_id}")
         return True
 
@@ -314,7 +353,6 @@ class VersionService:
 
         # Create version 1
         version = IndexVersion(
-            id=str(uuid4()),
             chatbot_id=chatbot_id,
             version=1,
             status=VersionStatus.ACTIVE,
@@ -1,55 +1,213 @@
 """
 Celery tasks for document processing pipeline.
 """
-import asyncio
+import time
 from datetime import datetime
+from typing import Iterable, Iterator, Optional
 
-from celery import shared_task
+from celery import chord, shared_task
+from celery.signals import worker_process_init
 from celery.utils.log import get_task_logger
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
 
-from src.core.config import settings
-from src.core.celery_app import OllamaRateLimitedTask
+from src.core.celery_app import OllamaRateLimitedTask, get_sync_redis, run_async
+from src.core.database import get_sync_session
 from src.models.document import Document, DocumentStatus as DocumentProcessingStatus
 from src.models.index_version import IndexVersion, VersionStatus
 from src.models.chatbot_service import ChatbotService
+from src.services.document.chunker import DocumentChunker
+from src.services.document.embedder import get_document_embedder
+from src.services.document.parser import get_pdf_page_count, iter_pdf_pages
+from src.services.graph.entity_extractor import extract_entities
+from src.services.graph.graph_builder import GraphBuilder
+from src.services.graph.relation_extractor import extract_relationships
 
 logger = get_task_logger(__name__)
 
+# Minimum seconds between intermediate progress updates per document
+PROGRESS_MIN_INTERVAL = 0.2
+# (time, stage) of the last progress update sent per document
+_last_progress: dict[str, tuple[float, str]] = {}
 
-def get_sync_redis():
-    """Get sync Redis client for Celery tasks."""
-    import redis
-    return redis.from_url(settings.redis_url)
+# Leading characters of a document sent to the LLM for graph extraction
+LLM_TEXT_LIMIT = 10000
+
+# PDFs with more pages than this are split into page ranges of this size
+PAGE_RANGE_SIZE = 50
+
+# Seconds the LLM text is kept in Redis between the embedding and graph stages
+LLM_TEXT_TTL = 86400
+
+
+_graph_builder: Optional[GraphBuilder] = None
+
+
+def get_task_graph_builder() -> GraphBuilder:
+    """Get the graph builder shared by tasks in this worker process."""
+    global _graph_builder
+    if _graph_builder is None:
+        _graph_builder = GraphBuilder()
+    return _graph_builder
+
+
+@worker_process_init.connect
+def init_task_clients(**kwargs):
+    """Create the Neo4j and Qdrant clients once per worker process."""
+    try:
+        get_task_graph_builder()
+        get_document_embedder()
+    except Exception as e:
+        logger.warning(f"Failed to initialize task clients: {e}")
 
 
 def set_progress(document_id: str, progress: int, stage: str, error: str = None):
-    """Set document processing progress in Redis."""
-    redis_client = get_sync_redis()
+    """
+    Set document processing progress in Redis.
+
+    Updates within a stage arriving within PROGRESS_MIN_INTERVAL of the
+    previous one are dropped; stage changes, completed (100) and failed (-1)
+    updates are always sent.
+    """
+    now = time.monotonic()
+    if progress in (100, -1):
+        _last_progress.pop(document_id, None)
+    else:
+        last_at, last_stage = _last_progress.get(document_id, (0.0, None))
+        if stage == last_stage and now - last_at < PROGRESS_MIN_INTERVAL:
+            return
+        _last_progress[document_id] = (now, stage)
+
     key = f"doc_progress:{document_id}"
     data = {"progress": str(progress), "stage": stage}
     if error:
         data["error"] = error
-    redis_client.hset(key, mapping=data)
-    redis_client.expire(key, 86400)  # 24 hours
-    # Publish progress update
-    redis_client.publish(
-        f"progress:{document_id}",
-        f"{progress}:{stage}:{error or ''}"
+
+    # Send all three commands in one round-trip
+    with get_sync_redis().pipeline(transaction=False) as pipe:
+        pipe.hset(key, mapping=data)
+        pipe.expire(key, 86400)  # 24 hours
+        # Publish progress update
+        pipe.publish(
+            f"progress:{document_id}",
+            f"{progress}:{stage}:{error or ''}"
+        )
+        pipe.execute()
+
+
+def page_ranges(page_count: int, size: int) -> list[tuple[int, int]]:
+    """
+    Split a page count into consecutive [start, end) ranges.
+
+    Args:
+        page_count: Total number of pages
+        size: Maximum pages per range
+
+    Returns:
+        List of (start_page, end_page) tuples
+    """
+    return [
+        (start, min(start + size, page_count))
+        for start in range(0, page_count, size)
+    ]
+
+
+def collect_text_head(pages: Iterable[dict], head: list[str], limit: int) -> Iterator[dict]:
+    """
+    Pass pages through unchanged while keeping the leading text.
+
+    Args:
+        pages: Iterable of page dicts with text
+        head: List that receives page texts until limit characters are kept
+        limit: Number of leading characters to keep
+
+    Yields:
+        The input pages
+    """
+    kept = 0
+    for page in pages:
+        if kept < limit:
+            head.append(page["text"])
+            kept += len(page["text"])
+        yield page
+
+
+def report_page_progress(
+    pages: Iterable[dict], document_id: str, page_count: int
+) -> Iterator[dict]:
+    """
+    Pass pages through unchanged while reporting progress from 30% to 70%.
+
+    Chunking and embedding overlap when pages are streamed, so progress
+    follows the pages consumed: the first half is reported as chunking
+    and the second half as embedding. Updates are throttled by
+    set_progress.
+
+    Args:
+        pages: Iterable of page dicts
+        document_id: UUID of the document
+        page_count: Total number of pages
+
+    Yields:
+        The input pages
+    """
+    set_progress(document_id, 30, "chunking")
+    for done, page in enumerate(pages, 1):
+        yield page
+        progress = 30 + 40 * done // max(page_count, 1)
+        if progress < 70:
+            set_progress(
+                document_id, progress, "chunking" if progress < 50 else "embedding"
+            )
+
+
+def read_text_head(file_path: str, limit: int) -> str:
+    """
+    Read only as many leading pages of a PDF as needed for limit characters.
+
+    Args:
+        file_path: Path to PDF file
+        limit: Number of leading characters wanted
+
+    Returns:
+        Leading document text
+    """
+    head: list[str] = []
+    kept = 0
+    for page in iter_pdf_pages(file_path):
+        head.append(page["text"])
+        kept += len(page["text"])
+        if kept >= limit:
+            break
+    return "\n\n".join(head)
+
+
+def store_llm_text(document_id: str, text: str) -> None:
+    """Keep a document's LLM text in Redis for the graph stage."""
+    get_sync_redis().set(
+        f"doc_llm_text:{document_id}", text[:LLM_TEXT_LIMIT], ex=LLM_TEXT_TTL
     )
 
 
-def get_db_session():
-    """Create sync database session for Celery tasks."""
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import Session
+def load_llm_text(document) -> str:
+    """
+    Load a document's LLM text stored by the embedding stage.
+
+    Falls back to re-reading the leading pages if it is no longer in Redis.
 
-    # Convert async URL to sync
-    sync_url = settings.database_url.replace("+asyncpg", "")
-    engine = create_engine(sync_url)
-    return Session(engine)
+    Args:
+        document: Document being processed
+
+    Returns:
+        Leading document text
+    """
+    text = get_sync_redis().get(f"doc_llm_text:{document.id}")
+    if text is None:
+        return read_text_head(document.file_path, LLM_TEXT_LIMIT)
+    return text.decode("utf-8")
+
+
+def get_db_session():
+    """Get sync database session for Celery tasks."""
+    return get_sync_session()
 
 
 def ensure_version_exists(db, chatbot_id: str) -> int:
@@ -63,8 +221,6 @@ def ensure_version_exists(db, chatbot_id: str) -> int:
     Returns:
         Active version number
     """
-    from uuid import uuid4
-
     # Check if any version exists
     existing_version = db.query(IndexVersion).filter(
         IndexVersion.chatbot_id == chatbot_id
@@ -82,7 +238,6 @@ def ensure_version_exists(db, chatbot_id: str) -> int:
 
     # Create version 1
     version = IndexVersion(
-        id=str(uuid4()),
         chatbot_id=chatbot_id,
         version=1,
         status=VersionStatus.ACTIVE,
@@ -100,19 +255,149 @@ def ensure_version_exists(db, chatbot_id: str) -> int:
     return 1
 
 
+def complete_document(db, document, chatbot_id: str, text: str, chunk_count: int) -> dict:
+    """
+    Run the graph stages for a document whose chunks are already embedded.
+
+    Args:
+        db: Database session
+        document: Document being processed
+        chatbot_id: Chatbot ID
+        text: Leading document text used for LLM extraction
+        chunk_count: Number of chunks stored in Qdrant
+
+    Returns:
+        Processing result dict
+    """
+    document_id = document.id
+
+    # Limit text for LLM; shared by entity and relationship extraction
+    llm_text = text[:LLM_TEXT_LIMIT]
+
+    # Stage 4: Entity Extraction (70%)
+    logger.info(f"[{document_id}] Extracting entities...")
+    set_progress(document_id, 70, "extracting")
+
+    # Extract entities from full text (LLM rate limited)
+    entities = extract_entities(llm_text, use_llm=True)
+
+    logger.info(f"[{document_id}] Extracted {len(entities)} entities")
+
+    # Stage 5: Relationship Extraction & Graph Building (90%)
+    logger.info(f"[{document_id}] Building knowledge graph...")
+    set_progress(document_id, 90, "graphing")
+
+    if entities:
+        relationships = extract_relationships(llm_text, entities, use_llm=True)
+
+        logger.info(f"[{document_id}] Extracted {len(relationships)} relationships")
+
+        # Build graph in Neo4j
+        builder = get_task_graph_builder()
+
+        run_async(builder.add_entities(entities, chatbot_id, document_id))
+        run_async(builder.add_relationships(relationships, chatbot_id, document_id))
+
+    # Stage 6: Completed (100%)
+    logger.info(f"[{document_id}] Document processing completed!")
+    set_progress(document_id, 100, "completed")
+
+    # Update document record
+    document.status = DocumentProcessingStatus.COMPLETED
+    document.chunk_count = chunk_count
+    document.entity_count = len(entities) if entities else 0
+    document.processed_at = datetime.utcnow()
+    db.commit()
+
+    # Ensure version exists for this chatbot
+    version = ensure_version_exists(db, chatbot_id)
+    logger.info(f"[{document_id}] Active version: {version}")
+
+    return {
+        "document_id": document_id,
+        "status": "completed",
+        "chunk_count": chunk_count,
+        "entity_count": len(entities) if entities else 0,
+        "version": version,
+    }
+
+
+def dispatch_graph_stage(
+    db, document, chatbot_id: str, text: Optional[str], chunk_count: int
+) -> dict:
+    """
+    Record the embedding result and queue the LLM graph stage.
+
+    Args:
+        db: Database session
+        document: Document being processed
+        chatbot_id: Chatbot ID
+        text: Leading document text, or None to re-read it in the graph stage
+        chunk_count: Number of chunks stored in Qdrant
+
+    Returns:
+        Embedding stage result dict
+    """
+    document_id = document.id
+
+    # chunk_count doubles as the resume marker for retries of the graph stage
+    document.chunk_count = chunk_count
+    document.status = DocumentProcessingStatus.EXTRACTING
+    db.commit()
+
+    if text is not None:
+        store_llm_text(document_id, text)
+    build_document_graph.delay(document_id, chatbot_id)
+
+    # The rest of the progress updates are sent from the llm queue worker
+    _last_progress.pop(document_id, None)
+
+    return {
+        "document_id": document_id,
+        "status": "embedded",
+        "chunk_count": chunk_count,
+    }
+
+
+def mark_document_failed(db, document_id: str, exc: Exception) -> None:
+    """
+    Record a processing failure in Redis progress and on the document.
+
+    Args:
+        db: Database session
+        document_id: Document ID
+        exc: Error that stopped processing
+    """
+    logger.error(f"[{document_id}] Document processing failed: {exc}")
+    set_progress(document_id, -1, "failed", str(exc))
+
+    # Update document status
+    try:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document:
+            document.status = DocumentProcessingStatus.FAILED
+            document.error_message = str(exc)[:500]
+            db.commit()
+    except Exception:
+        pass
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def process_document(self, document_id: str, chatbot_id: str) -> dict:
     """
     Process a PDF document through the full GraphRAG pipeline.
 
     Stages:
-    1. Parsing (10%) - Extract text from PDF
-    2. Chunking (30%) - Split into semantic chunks
-    3. Embedding (50%) - Generate vector embeddings
+    1. Parsing (10%) - Open the PDF
+    2-3. Chunking (30%) and Embedding (50%) - Chunk and embed the PDF page
+         by page, with progress reported as pages are consumed
     4. Extracting (70%) - Extract entities from chunks
     5. Graphing (90%) - Build knowledge graph
     6. Completed (100%) - Finalize
 
+    This task runs stages 1-3; stages 4-6 run in build_document_graph on
+    the llm queue, so LLM waits don't hold a document worker.
+
     Args:
         document_id: UUID of the document to process
         chatbot_id: UUID of the chatbot service
@@ -128,118 +413,250 @@ def process_document(self, document_id: str, chatbot_id: str) -> dict:
         if not document:
             raise ValueError(f"Document not found: {document_id}")
 
+        embedder = get_document_embedder()
+        stored_count = embedder.count_by_document(document_id)
+
+        # Already processed by an earlier delivery of this task
+        if document.status == DocumentProcessingStatus.COMPLETED and stored_count > 0:
+            logger.info(f"[{document_id}] Already completed, skipping")
+            return {
+                "document_id": document_id,
+                "status": "completed",
+                "chunk_count": document.chunk_count,
+                "entity_count": document.entity_count,
+                "version": ensure_version_exists(db, chatbot_id),
+            }
+
         # Update status to parsing (first processing stage)
         document.status = DocumentProcessingStatus.PARSING
         db.commit()
 
-        # Stage 1: Parsing (10%)
+        # Stages 1-3: Parse, chunk and embed page by page, so only the
+        # current page and embedding batch are held in memory
         logger.info(f"[{document_id}] Starting PDF parsing...")
         set_progress(document_id, 10, "parsing")
 
-        from src.services.document.parser import extract_text_from_pdf
-        text = extract_text_from_pdf(document.file_path)
-
-        if not text or not text.strip():
+        # chunk_count is recorded once all chunks are stored, so a retry with
+        # a matching point count only needs to redo the graph stages
+        if document.chunk_count and stored_count == document.chunk_count:
+            logger.info(f"[{document_id}] Reusing {stored_count} stored vectors")
+            return dispatch_graph_stage(db, document, chatbot_id, None, stored_count)
+
+        # Drop vectors left by an interrupted attempt to avoid duplicates
+        if stored_count:
+            embedder.delete_by_document(document_id)
+
+        # Large PDFs are split into page ranges processed by parallel subtasks
+        page_count = get_pdf_page_count(document.file_path)
+        if page_count > PAGE_RANGE_SIZE:
+            ranges = page_ranges(page_count, PAGE_RANGE_SIZE)
+            logger.info(
+                f"[{document_id}] Splitting {page_count} pages into {len(ranges)} subtasks"
+            )
+            set_progress(document_id, 30, "chunking")
+            get_sync_redis().delete(f"doc_ranges_done:{document_id}")
+            chord([
+                process_document_pages.s(
+                    document_id, chatbot_id, start, end, range_count=len(ranges)
+                )
+                for start, end in ranges
+            ])(finalize_document.s(document_id, chatbot_id))
+
+            return {
+                "document_id": document_id,
+                "status": "dispatched",
+                "page_ranges": len(ranges),
+            }
+
+        # Keep the leading text for LLM entity/relationship extraction
+        text_head: list[str] = []
+        pages = collect_text_head(
+            report_page_progress(
+                iter_pdf_pages(document.file_path), document_id, page_count
+            ),
+            text_head,
+            LLM_TEXT_LIMIT,
+        )
+        chunks = DocumentChunker().iter_page_chunks(pages, document_id, document.filename)
+
+        chunk_count = run_async(embedder.embed_and_store_concurrent(chunks, chatbot_id))
+
+        text = "\n\n".join(text_head)
+        if not text.strip():
             raise ValueError("No text content extracted from PDF")
 
-        logger.info(f"[{document_id}] Extracted {len(text)} characters")
+        if not chunk_count:
+            raise ValueError("No chunks created from document")
 
-        # Stage 2: Chunking (30%)
-        logger.info(f"[{document_id}] Chunking text...")
-        set_progress(document_id, 30, "chunking")
+        logger.info(f"[{document_id}] Stored {chunk_count} vectors in Qdrant")
 
-        from src.services.document.chunker import chunk_document
-        chunks = chunk_document(text, document_id, document.filename)
+        return dispatch_graph_stage(db, document, chatbot_id, text, chunk_count)
 
-        logger.info(f"[{document_id}] Created {len(chunks)} chunks")
+    except Exception as exc:
+        mark_document_failed(db, document_id, exc)
+        raise self.retry(exc=exc)
+
+    finally:
+        db.close()
 
-        if not chunks:
-            raise ValueError("No chunks created from document")
 
-        # Stage 3: Embedding (50%)
-        logger.info(f"[{document_id}] Generating embeddings...")
-        set_progress(document_id, 50, "embedding")
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def process_document_pages(
+    self,
+    document_id: str,
+    chatbot_id: str,
+    start_page: int,
+    end_page: int,
+    range_count: int = 1,
+) -> dict:
+    """
+    Parse, chunk and embed one page range of a large PDF.
+
+    Chunk indexes restart at 0 for each range; page_num stays absolute, so
+    chunks are ordered by (page_num, chunk_index). Progress moves from 30%
+    towards 70% as ranges finish.
+    Retried like process_document. A retry first deletes the range's
+    vectors from the failed attempt, and the document is marked failed only
+    once retries run out, since the chord then never finalizes it.
+
+    Args:
+        document_id: UUID of the document
+        chatbot_id: UUID of the chatbot service
+        start_page: Zero-based index of the first page
+        end_page: Zero-based index to stop before
+        range_count: Number of ranges the document was split into
+
+    Returns:
+        Dict with chunk_count and the range's leading text
+    """
+    db = get_db_session()
+
+    try:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            raise ValueError(f"Document not found: {document_id}")
 
-        from src.services.document.embedder import get_document_embedder
         embedder = get_document_embedder()
-        point_ids = embedder.embed_and_store(chunks, chatbot_id)
+        if self.request.retries:
+            embedder.delete_by_page_range(document_id, start_page, end_page)
+
+        text_head: list[str] = []
+        pages = collect_text_head(
+            iter_pdf_pages(document.file_path, start_page, end_page),
+            text_head,
+            LLM_TEXT_LIMIT,
+        )
+        chunks = DocumentChunker().iter_page_chunks(pages, document_id, document.filename)
+        chunk_count = run_async(embedder.embed_and_store_concurrent(chunks, chatbot_id))
+
+        logger.info(
+            f"[{document_id}] Pages {start_page + 1}-{end_page}: "
+            f"stored {chunk_count} vectors in Qdrant"
+        )
+
+        # Ranges finish in any order and in different workers, so the count
+        # of finished ranges is kept in Redis
+        done_key = f"doc_ranges_done:{document_id}"
+        with get_sync_redis().pipeline(transaction=False) as pipe:
+            pipe.incr(done_key)
+            pipe.expire(done_key, 86400)
+            ranges_done = pipe.execute()[0]
+        progress = 30 + 40 * ranges_done // max(range_count, 1)
+        if progress < 70:
+            set_progress(document_id, progress, "embedding")
+        _last_progress.pop(document_id, None)
+
+        return {
+            "chunk_count": chunk_count,
+            "text": "\n\n".join(text_head)[:LLM_TEXT_LIMIT],
+        }
+
+    except Exception as exc:
+        if self.request.retries >= self.max_retries:
+            mark_document_failed(db, document_id, exc)
+            raise
+        raise self.retry(exc=exc)
 
-        logger.info(f"[{document_id}] Stored {len(point_ids)} vectors in Qdrant")
+    finally:
+        db.close()
 
-        # Stage 4: Entity Extraction (70%)
-        logger.info(f"[{document_id}] Extracting entities...")
-        set_progress(document_id, 70, "extracting")
 
-        from src.services.graph.entity_extractor import extract_entities
-        # Extract entities from full text (LLM rate limited)
-        entities = extract_entities(text[:10000], use_llm=True)  # Limit text for LLM
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def finalize_document(
+    self,
+    range_results: list[dict],
+    document_id: str,
+    chatbot_id: str,
+) -> dict:
+    """
+    Queue the graph stage once all page ranges of a document are embedded.
 
-        logger.info(f"[{document_id}] Extracted {len(entities)} entities")
+    Args:
+        range_results: Results of process_document_pages, in page order
+        document_id: UUID of the document
+        chatbot_id: UUID of the chatbot service
 
-        # Stage 5: Relationship Extraction & Graph Building (90%)
-        logger.info(f"[{document_id}] Building knowledge graph...")
-        set_progress(document_id, 90, "graphing")
+    Returns:
+        Embedding stage result dict
+    """
+    db = get_db_session()
 
-        if entities:
-            from src.services.graph.relation_extractor import extract_relationships
-            relationships = extract_relationships(text[:10000], entities, use_llm=True)
+    try:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            raise ValueError(f"Document not found: {document_id}")
 
-            logger.info(f"[{document_id}] Extracted {len(relationships)} relationships")
+        get_sync_redis().delete(f"doc_ranges_done:{document_id}")
+        chunk_count = sum(result["chunk_count"] for result in range_results)
+        text = "\n\n".join(result["text"] for result in range_results if result["text"])
 
-            # Build graph in Neo4j
-            from src.services.graph.graph_builder import GraphBuilder
-            builder = GraphBuilder()
+        if not text.strip():
+            raise ValueError("No text content extracted from PDF")
 
-            # Run async operations in new event loop
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    builder.add_entities(entities, chatbot_id, document_id)
-                )
-                loop.run_until_complete(
-                    builder.add_relationships(relationships, chatbot_id, document_id)
-                )
-            finally:
-                loop.close()
-
-        # Stage 6: Completed (100%)
-        logger.info(f"[{document_id}] Document processing completed!")
-        set_progress(document_id, 100, "completed")
-
-        # Update document record
-        document.status = DocumentProcessingStatus.COMPLETED
-        document.chunk_count = len(chunks)
-        document.entity_count = len(entities) if entities else 0
-        document.processed_at = datetime.utcnow()
-        db.commit()
+        if not chunk_count:
+            raise ValueError("No chunks created from document")
 
-        # Ensure version exists for this chatbot
-        version = ensure_version_exists(db, chatbot_id)
-        logger.info(f"[{document_id}] Active version: {version}")
+        logger.info(f"[{document_id}] Stored {chunk_count} vectors in Qdrant")
 
-        return {
-            "document_id": document_id,
-            "status": "completed",
-            "chunk_count": len(chunks),
-            "entity_count": len(entities) if entities else 0,
-            "version": version,
-        }
+        return dispatch_graph_stage(db, document, chatbot_id, text, chunk_count)
 
     except Exception as exc:
-        logger.error(f"[{document_id}] Document processing failed: {exc}")
-        set_progress(document_id, -1, "failed", str(exc))
-
-        # Update document status
-        try:
-            document = db.query(Document).filter(Document.id == document_id).first()
-            if document:
-                document.status = DocumentProcessingStatus.FAILED
-                document.error_message = str(exc)[:500]
-                db.commit()
-        except Exception:
-            pass
+        mark_document_failed(db, document_id, exc)
+        raise self.retry(exc=exc)
+
+    finally:
+        db.close()
+
 
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def build_document_graph(self, document_id: str, chatbot_id: str) -> dict:
+    """
+    Extract entities and relationships and build the knowledge graph.
+
+    Runs after the document's chunks are embedded (stages 4-6).
+
+    Args:
+        document_id: UUID of the document
+        chatbot_id: UUID of the chatbot service
+
+    Returns:
+        Processing result dict
+    """
+    db = get_db_session()
+
+    try:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            raise ValueError(f"Document not found: {document_id}")
+
+        text = load_llm_text(document)
+        result = complete_document(db, document, chatbot_id, text, document.chunk_count)
+
+        get_sync_redis().delete(f"doc_llm_text:{document_id}")
+        return result
+
+    except Exception as exc:
+        mark_document_failed(db, document_id, exc)
         raise self.retry(exc=exc)
 
     finally:
@@ -262,7 +679,6 @@ def extract_entities_task(self, text: str, document_id: str) -> list:
     logger.info(f"[{document_id}] Extracting entities with LLM...")
 
     try:
-        from src.services.graph.entity_extractor import extract_entities
         entities = extract_entities(text, use_llm=True)
         return entities
     except Exception as exc:
@@ -289,23 +705,14 @@ def cleanup_document_task(self, document_id: str, chatbot_id: str) -> dict:
 
     try:
         # Delete vectors from Qdrant
-        from src.services.document.embedder import get_document_embedder
         embedder = get_document_embedder()
         deleted_vectors = embedder.delete_by_document(document_id)
         logger.info(f"Deleted {deleted_vectors} vectors from Qdrant")
 
         # Delete nodes from Neo4j
-        from src.services.graph.graph_builder import GraphBuilder
-        builder = GraphBuilder()
-
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            deleted_nodes = loop.run_until_complete(
-                builder.delete_by_document(document_id)
-            )
-        finally:
-            loop.close()
+        builder = get_task_graph_builder()
+
+        deleted_nodes = run_async(builder.delete_by_document(document_id))
 
         logger.info(f"Deleted {deleted_nodes} nodes from Neo4j")
 
@@ -339,23 +746,14 @@ def cleanup_chatbot_task(self, chatbot_id: str) -> dict:
 
     try:
         # Delete vectors from Qdrant
-        from src.services.document.embedder import get_document_embedder
         embedder = get_document_embedder()
         deleted_vectors = embedder.delete_by_chatbot(chatbot_id)
         logger.info(f"Deleted {deleted_vectors} vectors from Qdrant")
 
         # Delete nodes from Neo4j
-        from src.services.graph.graph_builder import GraphBuilder
-        builder = GraphBuilder()
-
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            deleted_nodes = loop.run_until_complete(
-                builder.delete_by_chatbot(chatbot_id)
-            )
-        finally:
-            loop.close()
+        builder = get_task_graph_builder()
+
+        deleted_nodes = run_async(builder.delete_by_chatbot(chatbot_id))
 
         logger.info(f"Deleted {deleted_nodes} nodes from Neo4j")
 
@@ -2,36 +2,151 @@
 Celery tasks for statistics aggregation and maintenance.
 """
 import logging
-from datetime import date, datetime, timedelta
+from datetime import datetime, time, timedelta
 
 from celery import shared_task
 from sqlalchemy import select, delete, func, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from src.core.config import settings
+from src.core.database import get_sync_session
 from src.models.stats import ChatbotStats
 from src.models.conversation import ConversationSession, Message, MessageRole
-from src.models.chatbot_service import ChatbotService
+from src.models.system_settings import SystemSettings, SettingKeys
+from src.services.stats_service import (
+    build_daily_stats_rows,
+    build_stats_row,
+    daily_message_stats_query,
+    daily_session_counts_query,
+    message_stats_columns,
+    parse_stats_cursor,
+    stats_cursor_query,
+    timing_stats_columns,
+)
 
 logger = logging.getLogger(__name__)
 
+# Maximum expired sessions deleted per transaction
+CLEANUP_BATCH_SIZE = 1000
 
-def get_sync_session():
-    """Create a synchronous database session for Celery tasks."""
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import Session
+# Messages are stamped before they commit, so each aggregation window stops
+# this far short of now to let in-flight transactions land first
+STATS_AGGREGATION_LAG = timedelta(minutes=1)
 
-    # Convert async URL to sync
-    sync_url = settings.database_url.replace("+asyncpg", "")
-    engine = create_engine(sync_url)
-    return Session(engine)
+# Isolation for aggregation transactions, so every query sees the same snapshot
+SNAPSHOT_ISOLATION = {"isolation_level": "REPEATABLE READ"}
+
+# (sum, samples, average) columns maintained by adding deltas
+_TIMING_COLUMNS = (
+    ("response_time_sum_ms", "response_time_samples", "avg_response_time_ms"),
+    ("retrieval_time_sum_ms", "retrieval_time_samples", "avg_retrieval_time_ms"),
+)
+
+
+def upsert_daily_stats(session, rows: list[dict]) -> None:
+    """
+    Insert or overwrite daily stats rows in a single statement.
+
+    Args:
+        session: Sync database session
+        rows: ChatbotStats column values, keyed by column name
+    """
+    if not rows:
+        return
+
+    stmt = pg_insert(ChatbotStats).values(rows)
+    session.connection().execute(
+        stmt.on_conflict_do_update(
+            index_elements=["chatbot_id", "date"],
+            set_={
+                column: stmt.excluded[column]
+                for column in rows[0]
+                if column not in ("chatbot_id", "date")
+            },
+        )
+    )
+
+
+def accumulate_timing_deltas(session, window_start: datetime, window_end: datetime) -> list:
+    """
+    Add assistant timings from a window onto daily stats, entirely in SQL.
+
+    Deltas are aggregated and merged by one INSERT ... SELECT ... ON CONFLICT
+    statement, so no per-chatbot rows travel through Python.
+
+    Args:
+        session: Sync database session
+        window_start: Include messages created at or after this time
+        window_end: Include messages created before this time
+
+    Returns:
+        (chatbot_id, date) of every stats row touched
+    """
+    message_day = func.date(Message.created_at)
+    response_sum, response_samples, retrieval_sum, retrieval_samples = timing_stats_columns()
+    deltas = (
+        select(
+            Message.chatbot_id,
+            message_day,
+            func.coalesce(response_sum, 0),
+            response_samples,
+            response_sum // func.nullif(response_samples, 0),
+            func.coalesce(retrieval_sum, 0),
+            retrieval_samples,
+            retrieval_sum // func.nullif(retrieval_samples, 0),
+        )
+        .where(
+            and_(
+                Message.chatbot_id.isnot(None),
+                Message.role == MessageRole.ASSISTANT,
+                Message.created_at >= window_start,
+                Message.created_at < window_end,
+            )
+        )
+        .group_by(Message.chatbot_id, message_day)
+    )
+
+    stmt = pg_insert(ChatbotStats).from_select(
+        [
+            "chatbot_id",
+            "date",
+            "response_time_sum_ms",
+            "response_time_samples",
+            "avg_response_time_ms",
+            "retrieval_time_sum_ms",
+            "retrieval_time_samples",
+            "avg_retrieval_time_ms",
+        ],
+        deltas,
+    )
+
+    # Add each delta to the stored sums and recompute the averages
+    table = ChatbotStats.__table__
+    set_ = {}
+    for sum_column, samples_column, avg_column in _TIMING_COLUMNS:
+        total = func.coalesce(table.c[sum_column], 0) + stmt.excluded[sum_column]
+        samples = func.coalesce(table.c[samples_column], 0) + stmt.excluded[samples_column]
+        set_[sum_column] = total
+        set_[samples_column] = samples
+        set_[avg_column] = total // func.nullif(samples, 0)
+
+    return session.connection().execute(
+        stmt.on_conflict_do_update(
+            index_elements=["chatbot_id", "date"], set_=set_
+        )
+        .returning(ChatbotStats.chatbot_id, ChatbotStats.date)
+    ).all()
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def aggregate_daily_stats(self) -> dict:
     """
-    Aggregate daily statistics for all chatbots.
+    Fold messages since the previous run into daily statistics.
 
-    This task runs periodically (every hour) to update daily stats.
+    This task runs periodically (every hour). Session, message and token
+    counts are kept current by the chat API, so each run only adds the
+    response and retrieval time sums of assistant messages created since
+    the stored cursor, and the work per run follows new rows rather than
+    the size of the day. The first run rebuilds today from scratch.
 
     Returns:
         Dict with aggregation results
@@ -46,142 +161,89 @@ def aggregate_daily_stats(self) -> dict:
     }
 
     try:
-        # Get all chatbot IDs
-        chatbot_ids = session.execute(select(ChatbotService.id)).scalars().all()
-
-        today = date.today()
-        start_of_day = datetime.combine(today, datetime.min.time())
-        end_of_day = datetime.combine(today, datetime.max.time())
-
-        for chatbot_id in chatbot_ids:
-            try:
-                # Count today's sessions
-                session_count = session.execute(
-                    select(func.count())
-                    .select_from(ConversationSession)
+        # Aggregates return plain rows, so skip the ORM layer; one snapshot
+        # keeps the session and message aggregates consistent with each other
+        conn = session.connection(execution_options=SNAPSHOT_ISOLATION)
+
+        # Lock the cursor so overlapping runs cannot add the same delta twice
+        conn.execute(
+            pg_insert(SystemSettings)
+            .values(
+                key=SettingKeys.STATS_AGGREGATED_UNTIL,
+                value="",
+                description="Messages before this time are included in stats timings",
+            )
+            .on_conflict_do_nothing(index_elements=["key"])
+        )
+        window_start = parse_stats_cursor(conn.execute(stats_cursor_query()).scalar())
+        window_end = datetime.utcnow() - STATS_AGGREGATION_LAG
+
+        if window_start is None:
+            # Nothing accumulated yet: rebuild today, timings up to the window end
+            today = window_end.date()
+            start_of_day = datetime.combine(today, time.min)
+            start_of_next_day = start_of_day + timedelta(days=1)
+
+            session_counts = dict(
+                conn.execute(
+                    select(ConversationSession.chatbot_id, func.count())
                     .where(
                         and_(
-                            ConversationSession.chatbot_id == chatbot_id,
                             ConversationSession.created_at >= start_of_day,
-                            ConversationSession.created_at <= end_of_day,
-                        )
-                    )
-                ).scalar() or 0
-
-                # Count today's messages (via join)
-                message_count = session.execute(
-                    select(func.count())
-                    .select_from(Message)
-                    .join(
-                        ConversationSession,
-                        Message.session_id == ConversationSession.id,
-                    )
-                    .where(
-                        and_(
-                            ConversationSession.chatbot_id == chatbot_id,
-                            Message.created_at >= start_of_day,
-                            Message.created_at <= end_of_day,
+                            ConversationSession.created_at < start_of_next_day,
                         )
                     )
-                ).scalar() or 0
-
-                # Calculate average response time from assistant messages
-                response_time_result = session.execute(
-                    select(func.avg(Message.response_time_ms))
-                    .join(ConversationSession, Message.session_id == ConversationSession.id)
-                    .where(
-                        and_(
-                            ConversationSession.chatbot_id == chatbot_id,
-                            Message.created_at >= start_of_day,
-                            Message.created_at <= end_of_day,
-                            Message.role == MessageRole.ASSISTANT,
-                            Message.response_time_ms.isnot(None),
-                        )
-                    )
-                ).scalar()
-
-                # Calculate token totals
-                token_result = session.execute(
-                    select(
-                        func.sum(Message.input_tokens),
-                        func.sum(Message.output_tokens),
-                    )
-                    .join(ConversationSession, Message.session_id == ConversationSession.id)
-                    .where(
-                        and_(
-                            ConversationSession.chatbot_id == chatbot_id,
-                            Message.created_at >= start_of_day,
-                            Message.created_at <= end_of_day,
-                            Message.role == MessageRole.ASSISTANT,
-                        )
-                    )
-                ).one()
-                total_input_tokens = token_result[0] or 0
-                total_output_tokens = token_result[1] or 0
-
-                # Calculate retrieval metrics
-                retrieval_result = session.execute(
-                    select(
-                        func.sum(Message.retrieval_count),
-                        func.avg(Message.retrieval_time_ms),
-                    )
-                    .join(ConversationSession, Message.session_id == ConversationSession.id)
+                    .group_by(ConversationSession.chatbot_id)
+                ).all()
+            )
+            message_stats = {
+                row[0]: row[1:]
+                for row in conn.execute(
+                    select(Message.chatbot_id, *message_stats_columns(window_end))
                     .where(
                         and_(
-                            ConversationSession.chatbot_id == chatbot_id,
+                            Message.chatbot_id.isnot(None),
                             Message.created_at >= start_of_day,
-                            Message.created_at <= end_of_day,
-                            Message.role == MessageRole.ASSISTANT,
+                            Message.created_at < start_of_next_day,
                         )
                     )
-                ).one()
-                total_retrieval_count = retrieval_result[0] or 0
-                avg_retrieval_time = retrieval_result[1]
-
-                # Get or create stats record
-                stats = session.execute(
-                    select(ChatbotStats).where(
-                        and_(
-                            ChatbotStats.chatbot_id == chatbot_id,
-                            ChatbotStats.date == today,
-                        )
-                    )
-                ).scalar_one_or_none()
-
-                if stats:
-                    stats.session_count = session_count
-                    stats.message_count = message_count
-                    stats.avg_response_time_ms = int(response_time_result) if response_time_result else None
-                    stats.total_input_tokens = total_input_tokens
-                    stats.total_output_tokens = total_output_tokens
-                    stats.total_retrieval_count = total_retrieval_count
-                    stats.avg_retrieval_time_ms = int(avg_retrieval_time) if avg_retrieval_time else None
-                else:
-                    from uuid import uuid4
-
-                    stats = ChatbotStats(
-                        id=str(uuid4()),
-                        chatbot_id=chatbot_id,
-                        date=today,
-                        session_count=session_count,
-                        message_count=message_count,
-                        avg_response_time_ms=int(response_time_result) if response_time_result else None,
-                        total_input_tokens=total_input_tokens,
-                        total_output_tokens=total_output_tokens,
-                        total_retrieval_count=total_retrieval_count,
-                        avg_retrieval_time_ms=int(avg_retrieval_time) if avg_retrieval_time else None,
-                    )
-                    session.add(stats)
-
-                session.commit()
-                results["stats_updated"] += 1
-
-            except Exception as e:
-                logger.error(f"Failed to aggregate stats for chatbot {chatbot_id}: {e}")
-                results["errors"].append(f"{chatbot_id}: {str(e)}")
-                session.rollback()
+                    .group_by(Message.chatbot_id)
+                ).all()
+            }
+            rows = [
+                build_stats_row(
+                    chatbot_id,
+                    today,
+                    session_counts.get(chatbot_id, 0),
+                    message_stats.get(chatbot_id),
+                )
+                for chatbot_id in session_counts.keys() | message_stats.keys()
+            ]
+            upsert_daily_stats(session, rows)
+            touched = [row["chatbot_id"] for row in rows]
+
+        elif window_start < window_end:
+            # Timing deltas of assistant messages created since the last run
+            touched = [
+                chatbot_id
+                for chatbot_id, _ in accumulate_timing_deltas(session, window_start, window_end)
+            ]
+
+        else:
+            logger.info("Stats are already aggregated up to now")
+            session.rollback()
+            return results
+
+        # Advance the cursor in the same transaction as the stats it covers
+        conn.execute(
+            SystemSettings.__table__.update()
+            .where(SystemSettings.key == SettingKeys.STATS_AGGREGATED_UNTIL)
+            .values(value=window_end.isoformat(), updated_at=datetime.utcnow())
+        )
+        session.commit()
 
-            results["processed_chatbots"] += 1
+        results["processed_chatbots"] = len(set(touched))
+        results["stats_updated"] = len(touched)
 
         logger.info(
             f"Stats aggregation complete: {results['processed_chatbots']} chatbots, "
@@ -191,6 +253,7 @@ def aggregate_daily_stats(self) -> dict:
     except Exception as e:
         logger.error(f"Stats aggregation failed: {e}")
         results["errors"].append(str(e))
+        session.rollback()
         raise self.retry(exc=e)
 
     finally:
@@ -220,16 +283,23 @@ def cleanup_expired_sessions(self) -> dict:
     try:
         now = datetime.utcnow()
 
-        # Find and delete expired sessions
+        # Delete expired sessions in batches to keep each transaction small
         # Messages will be deleted by CASCADE
-        result = session.execute(
-            delete(ConversationSession).where(
-                ConversationSession.expires_at < now
-            )
+        expired_ids = (
+            select(ConversationSession.id)
+            .where(ConversationSession.expires_at < now)
+            .limit(CLEANUP_BATCH_SIZE)
         )
-        results["deleted_sessions"] = result.rowcount
-
-        session.commit()
+        while True:
+            result = session.execute(
+                delete(ConversationSession)
+                .where(ConversationSession.id.in_(expired_ids))
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+            if result.rowcount == 0:
+                break
+            results["deleted_sessions"] += result.rowcount
 
         logger.info(f"Cleaned up {results['deleted_sessions']} expired sessions")
 
@@ -257,8 +327,6 @@ def recalculate_chatbot_stats(self, chatbot_id: str, days: int = 30) -> dict:
     Returns:
         Dict with recalculation results
     """
-    from uuid import uuid4
-
     logger.info(f"Recalculating stats for chatbot {chatbot_id}, last {days} days")
 
     session = get_sync_session()
@@ -270,141 +338,31 @@ def recalculate_chatbot_stats(self, chatbot_id: str, days: int = 30) -> dict:
     }
 
     try:
-        today = date.today()
-
-        for i in range(days):
-            stats_date = today - timedelta(days=i)
-            start_of_day = datetime.combine(stats_date, datetime.min.time())
-            end_of_day = datetime.combine(stats_date, datetime.max.time())
-
-            try:
-                # Count sessions
-                session_count = session.execute(
-                    select(func.count())
-                    .select_from(ConversationSession)
-                    .where(
-                        and_(
-                            ConversationSession.chatbot_id == chatbot_id,
-                            ConversationSession.created_at >= start_of_day,
-                            ConversationSession.created_at <= end_of_day,
-                        )
-                    )
-                ).scalar() or 0
-
-                # Count messages
-                message_count = session.execute(
-                    select(func.count())
-                    .select_from(Message)
-                    .join(
-                        ConversationSession,
-                        Message.session_id == ConversationSession.id,
-                    )
-                    .where(
-                        and_(
-                            ConversationSession.chatbot_id == chatbot_id,
-                            Message.created_at >= start_of_day,
-                            Message.created_at <= end_of_day,
-                        )
-                    )
-                ).scalar() or 0
-
-                # Calculate average response time from assistant messages
-                response_time_result = session.execute(
-                    select(func.avg(Message.response_time_ms))
-                    .join(ConversationSession, Message.session_id == ConversationSession.id)
-                    .where(
-                        and_(
-                            ConversationSession.chatbot_id == chatbot_id,
-                            Message.created_at >= start_of_day,
-                            Message.created_at <= end_of_day,
-                            Message.role == MessageRole.ASSISTANT,
-                            Message.response_time_ms.isnot(None),
-                        )
-                    )
-                ).scalar()
-
-                # Calculate token totals
-                token_result = session.execute(
-                    select(
-                        func.sum(Message.input_tokens),
-                        func.sum(Message.output_tokens),
-                    )
-                    .join(ConversationSession, Message.session_id == ConversationSession.id)
-                    .where(
-                        and_(
-                            ConversationSession.chatbot_id == chatbot_id,
-                            Message.created_at >= start_of_day,
-                            Message.created_at <= end_of_day,
-                            Message.role == MessageRole.ASSISTANT,
-                        )
-                    )
-                ).one()
-                total_input_tokens = token_result[0] or 0
-                total_output_tokens = token_result[1] or 0
-
-                # Calculate retrieval metrics
-                retrieval_result = session.execute(
-                    select(
-                        func.sum(Message.retrieval_count),
-                        func.avg(Message.retrieval_time_ms),
-                    )
-                    .join(ConversationSession, Message.session_id == ConversationSession.id)
-                    .where(
-                        and_(
-                            ConversationSession.chatbot_id == chatbot_id,
-                            Message.created_at >= start_of_day,
-                            Message.created_at <= end_of_day,
-                            Message.role == MessageRole.ASSISTANT,
-                        )
-                    )
-                ).one()
-                total_retrieval_count = retrieval_result[0] or 0
-                avg_retrieval_time = retrieval_result[1]
-
-                # Get or create stats record
-                stats = session.execute(
-                    select(ChatbotStats).where(
-                        and_(
-                            ChatbotStats.chatbot_id == chatbot_id,
-                            ChatbotStats.date == stats_date,
-                        )
-                    )
-                ).scalar_one_or_none()
-
-                if stats:
-                    stats.session_count = session_count
-                    stats.message_count = message_count
-                    stats.avg_response_time_ms = int(response_time_result) if response_time_result else None
-                    stats.total_input_tokens = total_input_tokens
-                    stats.total_output_tokens = total_output_tokens
-                    stats.total_retrieval_count = total_retrieval_count
-                    stats.avg_retrieval_time_ms = int(avg_retrieval_time) if avg_retrieval_time else None
-                else:
-                    stats = ChatbotStats(
-                        id=str(uuid4()),
-                        chatbot_id=chatbot_id,
-                        date=stats_date,
-                        session_count=session_count,
-                        message_count=message_count,
-                        avg_response_time_ms=int(response_time_result) if response_time_result else None,
-                        total_input_tokens=total_input_tokens,
-                        total_output_tokens=total_output_tokens,
-                        total_retrieval_count=total_retrieval_count,
-                        avg_retrieval_time_ms=int(avg_retrieval_time) if avg_retrieval_time else None,
-                    )
-                    session.add(stats)
-
-                session.commit()
-                results["stats_updated"] += 1
-
-            except Exception as e:
-                logger.error(
-                    f"Failed to recalculate stats for {chatbot_id} on {stats_date}: {e}"
-                )
-                results["errors"].append(f"{stats_date}: {str(e)}")
-                session.rollback()
+        today = datetime.utcnow().date()
+        stats_dates = [today - timedelta(days=i) for i in range(days)]
+        range_start = datetime.combine(today - timedelta(days=days - 1), time.min)
+        range_end = datetime.combine(today + timedelta(days=1), time.min)
+
+        # Aggregates return plain rows, so skip the ORM layer; one snapshot
+        # keeps the session and message aggregates consistent with each other
+        conn = session.connection(execution_options=SNAPSHOT_ISOLATION)
+
+        # Timings past the cursor are added by the next aggregation run
+        timing_end = parse_stats_cursor(conn.execute(stats_cursor_query()).scalar())
+
+        session_rows = conn.execute(
+            daily_session_counts_query(chatbot_id, range_start, range_end)
+        ).all()
+        message_rows = conn.execute(
+            daily_message_stats_query(chatbot_id, range_start, range_end, timing_end)
+        ).all()
+        rows = build_daily_stats_rows(chatbot_id, stats_dates, session_rows, message_rows)
+
+        upsert_daily_stats(session, rows)
+        session.commit()
 
-            results["days_processed"] += 1
+        results["days_processed"] = len(stats_dates)
+        results["stats_updated"] = len(rows)
 
         logger.info(
             f"Stats recalculation complete for {chatbot_id}: "
@@ -414,6 +372,7 @@ def recalculate_chatbot_stats(self, chatbot_id: str, days: int = 30) -> dict:
     except Exception as e:
         logger.error(f"Stats recalculation failed for {chatbot_id}: {e}")
         results["errors"].append(str(e))
+        session.rollback()
         raise self.retry(exc=e)
 
     finally:
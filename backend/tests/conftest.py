@@ -2,16 +2,21 @@
 Pytest configuration and fixtures for GraphRAG backend tests.
 """
 import asyncio
+import hashlib
+import hmac
+import logging
 import os
-from typing import AsyncGenerator, Generator
+from types import SimpleNamespace
+from typing import AsyncGenerator
 from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
 import pytest
 import pytest_asyncio
+from fakeredis.aioredis import FakeRedis
 from fastapi import FastAPI
 from httpx import AsyncClient, ASGITransport
-from sqlalchemy import event
+from sqlalchemy import event, insert
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
@@ -25,7 +30,9 @@ os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
 os.environ["SECRET_KEY"] = "test-secret-key-for-testing-only"
 os.environ["REDIS_URL"] = "redis://localhost:6379/15"
 
+from src.core.config import Settings
 from src.core.database import Base, get_db
+from src.core.redis import RedisClient
 from src.models import (
     AdminUser,
     ChatbotService,
@@ -35,23 +42,72 @@ from src.models import (
     Message,
     MessageRole,
 )
+from src.services.auth_service import AuthService
+from src.services.stats_service import StatsService
 
 
 # =============================================================================
-# Database Fixtures
+# Test Run Configuration
 # =============================================================================
 
-@pytest.fixture(scope="session")
-def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
-    """Create event loop for async tests."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_auto_num_workers(config) -> int:
+    """
+    Size `-n auto` to all cores but two, leaving headroom for the desktop.
+
+    Each worker is its own process with its own in-memory SQLite database,
+    so workers never contend on a shared schema.
+    """
+    return max(1, (os.cpu_count() or 2) - 2)
+
+
+def pytest_collection_modifyitems(items) -> None:
+    """
+    Run every async test in the session event loop shared with the fixtures,
+    and group tests within each file by the fixtures they request.
+
+    Tests with identical fixture closures then run back to back, so any
+    fixture with a wider scope is built and torn down once per group.
+    The sort is stable and keeps files contiguous for `--dist=loadfile`.
+    """
+    session_loop = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if pytest_asyncio.is_async_test(item):
+            item.add_marker(session_loop, append=False)
+
+    file_order = {}
+    for item in items:
+        file_order.setdefault(item.path, len(file_order))
+    items.sort(
+        key=lambda item: (file_order[item.path], tuple(sorted(item.fixturenames)))
+    )
 
 
-@pytest_asyncio.fixture(scope="function")
+@pytest.fixture(scope="session", autouse=True)
+def quiet_logging():
+    """
+    Silence application and library logs below CRITICAL for the session.
+
+    Every request goes through the request-logging and rate-limit
+    middleware, so log records are built on the hot path of each test.
+    Set TEST_LOGS=1 to keep logging while debugging.
+    """
+    if os.environ.get("TEST_LOGS"):
+        yield
+        return
+
+    logging.disable(logging.ERROR)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+# =============================================================================
+# Database Fixtures
+# =============================================================================
+
+@pytest_asyncio.fixture(scope="session")
 async def test_engine():
-    """Create test database engine with SQLite in-memory."""
+    """Create test database engine with SQLite in-memory, once per session."""
     engine = create_async_engine(
         "sqlite+aiosqlite:///:memory:",
         connect_args={"check_same_thread": False},
@@ -59,6 +115,15 @@ async def test_engine():
         echo=False,
     )
 
+    # Let SQLAlchemy emit BEGIN itself so SAVEPOINTs work with pysqlite
+    @event.listens_for(engine.sync_engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
@@ -72,18 +137,26 @@ async def test_engine():
 
 @pytest_asyncio.fixture(scope="function")
 async def db_session(test_engine) -> AsyncGenerator[AsyncSession, None]:
-    """Create test database session."""
-    async_session = async_sessionmaker(
-        test_engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-        autocommit=False,
-        autoflush=False,
-    )
+    """
+    Create test database session inside a transaction rolled back after the test.
+
+    Commits in tests and fixtures only release a SAVEPOINT, so the schema is
+    created once per session and every test still starts from empty tables.
+    """
+    async with test_engine.connect() as conn:
+        transaction = await conn.begin()
+        async_session = async_sessionmaker(
+            bind=conn,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autoflush=False,
+            join_transaction_mode="create_savepoint",
+        )
+
+        async with async_session() as session:
+            yield session
 
-    async with async_session() as session:
-        yield session
-        await session.rollback()
+        await transaction.rollback()
 
 
 # =============================================================================
@@ -106,27 +179,76 @@ async def app(test_engine, db_session) -> FastAPI:
     main_app.dependency_overrides.clear()
 
 
-@pytest_asyncio.fixture(scope="function")
-async def client(app: FastAPI) -> AsyncGenerator[AsyncClient, None]:
-    """Create async HTTP client for testing."""
-    transport = ASGITransport(app=app)
-    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+@pytest_asyncio.fixture(scope="session")
+async def http_client() -> AsyncGenerator[AsyncClient, None]:
+    """Create one async HTTP client for the whole session."""
+    from src.main import app as main_app
+
+    # In-process ASGI dispatch; trust_env=False skips proxy and .netrc lookups
+    transport = ASGITransport(app=main_app)
+    async with AsyncClient(
+        transport=transport, base_url="http://test", trust_env=False
+    ) as ac:
         yield ac
 
 
+@pytest_asyncio.fixture(scope="function")
+async def client(app: FastAPI, http_client: AsyncClient) -> AsyncClient:
+    """Get the shared HTTP client, with this test's database session wired in."""
+    return http_client
+
+
+@pytest.fixture(scope="session")
+def base_settings() -> Settings:
+    """
+    Build Settings once per session.
+
+    Tests derive variants with `model_copy(update=...)` instead of paying
+    for environment and .env parsing on every construction.
+    """
+    return Settings()
+
+
 # =============================================================================
 # Model Fixtures
 # =============================================================================
 
+def _fast_password_hash(password: str) -> str:
+    """Deterministic stand-in for bcrypt; test passwords need no protection."""
+    return "sha256:" + hashlib.sha256(password.encode()).hexdigest()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fast_password_hashing():
+    """Replace bcrypt hashing and verification, which cost ~100ms per call."""
+    with patch.object(
+        AuthService, "hash_password", staticmethod(_fast_password_hash)
+    ), patch.object(
+        AuthService,
+        "verify_password",
+        staticmethod(
+            lambda plain, hashed: hmac.compare_digest(_fast_password_hash(plain), hashed)
+        ),
+    ):
+        yield
+
+
+@pytest.fixture(scope="session")
+def password_hashes(fast_password_hashing) -> dict[str, str]:
+    """Hash the fixture passwords once per session."""
+    return {
+        password: AuthService.hash_password(password)
+        for password in ("testpassword123", "adminpassword123")
+    }
+
+
 @pytest_asyncio.fixture
-async def admin_user(db_session: AsyncSession) -> AdminUser:
+async def admin_user(db_session: AsyncSession, password_hashes: dict) -> AdminUser:
     """Create test admin user."""
-    from src.core.security import get_password_hash
-
     user = AdminUser(
         id=str(uuid4()),
         email="test@example.com",
-        hashed_password=get_password_hash("testpassword123"),
+        hashed_password=password_hashes["testpassword123"],
         is_active=True,
         is_superuser=False,
     )
@@ -137,14 +259,12 @@ async def admin_user(db_session: AsyncSession) -> AdminUser:
 
 
 @pytest_asyncio.fixture
-async def superuser(db_session: AsyncSession) -> AdminUser:
+async def superuser(db_session: AsyncSession, password_hashes: dict) -> AdminUser:
     """Create test superuser."""
-    from src.core.security import get_password_hash
-
     user = AdminUser(
         id=str(uuid4()),
         email="admin@example.com",
-        hashed_password=get_password_hash("adminpassword123"),
+        hashed_password=password_hashes["adminpassword123"],
         is_active=True,
         is_superuser=True,
     )
@@ -190,6 +310,33 @@ async def inactive_chatbot(db_session: AsyncSession) -> ChatbotService:
     return bot
 
 
+@pytest_asyncio.fixture
+async def chatbot_factory(db_session: AsyncSession, admin_user: AdminUser):
+    """
+    Insert chatbots owned by admin_user with a single INSERT.
+
+    Call `await chatbot_factory(n, **overrides)`; returns the inserted rows.
+    """
+    async def _make(n: int = 1, **overrides) -> list[dict]:
+        rows = []
+        for _ in range(n):
+            bot_id = str(uuid4())
+            rows.append({
+                "id": bot_id,
+                "admin_id": admin_user.id,
+                "name": "Factory Chatbot",
+                "access_url": f"factory-{bot_id}",
+                "status": ChatbotStatus.ACTIVE,
+                "persona": {},
+                **overrides,
+            })
+        await db_session.execute(insert(ChatbotService), rows)
+        await db_session.flush()
+        return rows
+
+    return _make
+
+
 @pytest_asyncio.fixture
 async def chat_session(db_session: AsyncSession, chatbot: ChatbotService) -> ConversationSession:
     """Create test chat session."""
@@ -235,6 +382,98 @@ async def superuser_headers(client: AsyncClient, superuser: AdminUser) -> dict:
 # Mock Fixtures
 # =============================================================================
 
+_real_sleep = asyncio.sleep
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(request, monkeypatch):
+    """
+    Make asyncio.sleep yield to the event loop without waiting.
+
+    Streaming responses sleep between chunks to flush them to the client,
+    which is pure wall-clock time in tests. Mark a test with `real_sleep`
+    to keep real delays.
+    """
+    if request.node.get_closest_marker("real_sleep"):
+        return
+
+    async def _yield_only(delay, result=None):
+        return await _real_sleep(0, result)
+
+    monkeypatch.setattr(asyncio, "sleep", _yield_only)
+
+
+@pytest.fixture
+def stats_counters(monkeypatch) -> SimpleNamespace:
+    """
+    Replace the daily stats increments with counting no-ops.
+
+    The stats upserts use PostgreSQL-only SQL; tests read
+    `stats_counters.sessions` and `stats_counters.messages` instead.
+    """
+    counters = SimpleNamespace(sessions=0, messages=0)
+
+    async def _count_session(*args, **kwargs):
+        counters.sessions += 1
+
+    async def _count_message(*args, **kwargs):
+        counters.messages += 1
+
+    monkeypatch.setattr(
+        StatsService, "increment_session_count", staticmethod(_count_session)
+    )
+    monkeypatch.setattr(
+        StatsService, "increment_message_count", staticmethod(_count_message)
+    )
+    return counters
+
+
+@pytest.fixture
+def mock_retrieve(monkeypatch) -> dict:
+    """
+    Replace context retrieval with a canned result.
+
+    Returns the payload so tests can adjust it, e.g. set citations,
+    before sending a message.
+    """
+    payload = {
+        "context": "Test context",
+        "citations": [],
+        "vector_count": 1,
+        "graph_count": 0,
+    }
+
+    async def _retrieve(*args, **kwargs):
+        return payload
+
+    monkeypatch.setattr("src.services.chat_service.retrieve_context", _retrieve)
+    return payload
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_redis_client() -> FakeRedis:
+    """Serve RedisClient.get_client from fakeredis so no test touches the network."""
+    client = FakeRedis(decode_responses=True)
+
+    async def _get_client(cls):
+        return client
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(RedisClient, "get_client", classmethod(_get_client))
+        yield client
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def fake_redis(fake_redis_client: FakeRedis) -> FakeRedis:
+    """
+    Get the fake Redis client, emptied for this test.
+
+    Seed rate limit counters with `await fake_redis.set(key, count)`.
+    """
+    await fake_redis_client.flushall()
+    return fake_redis_client
+
+
 @pytest.fixture
 def mock_redis():
     """Mock Redis client."""
@@ -42,10 +42,11 @@ class TestSessionManagement:
     """Tests for session management."""
 
     @pytest.mark.asyncio
-    async def test_create_session(self, client: AsyncClient, chatbot: ChatbotService):
+    async def test_create_session(
+        self, client: AsyncClient, chatbot: ChatbotService, stats_counters
+    ):
         """Test creating a new chat session."""
-        with patch("src.services.stats_service.StatsService.increment_session_count", new_callable=AsyncMock):
-            response = await client.post(f"/api/v1/chat/{chatbot.access_url}/sessions")
+        response = await client.post(f"/api/v1/chat/{chatbot.access_url}/sessions")
 
         assert response.status_code == 200
         data = response.json()
@@ -55,24 +56,19 @@ class TestSessionManagement:
 
     @pytest.mark.asyncio
     async def test_create_session_with_initial_message(
-        self, client: AsyncClient, chatbot: ChatbotService, mock_llm, mock_qdrant
+        self,
+        client: AsyncClient,
+        chatbot: ChatbotService,
+        mock_llm,
+        mock_qdrant,
+        mock_retrieve,
+        stats_counters,
     ):
         """Test creating session with initial message."""
-        with patch("src.services.stats_service.StatsService.increment_session_count", new_callable=AsyncMock), \
-             patch("src.services.stats_service.StatsService.increment_message_count", new_callable=AsyncMock), \
-             patch("src.services.retrieval.retrieve_context", new_callable=AsyncMock) as mock_retrieve:
-
-            mock_retrieve.return_value = {
-                "context": "Test context",
-                "citations": [],
-                "vector_count": 1,
-                "graph_count": 0,
-            }
-
-            response = await client.post(
-                f"/api/v1/chat/{chatbot.access_url}/sessions",
-                json={"initial_message": "Hello, I have a question"},
-            )
+        response = await client.post(
+            f"/api/v1/chat/{chatbot.access_url}/sessions",
+            json={"initial_message": "Hello, I have a question"},
+        )
 
         assert response.status_code == 200
         data = response.json()
@@ -117,22 +113,15 @@ class TestMessageSending:
         chat_session: ConversationSession,
         mock_llm,
         mock_qdrant,
+        mock_retrieve,
+        stats_counters,
     ):
         """Test sending message with non-streaming response."""
-        with patch("src.services.stats_service.StatsService.increment_message_count", new_callable=AsyncMock), \
-             patch("src.services.retrieval.retrieve_context", new_callable=AsyncMock) as mock_retrieve:
-
-            mock_retrieve.return_value = {
-                "context": "Test context from documents",
-                "citations": [{"filename": "test.pdf", "page_num": 1}],
-                "vector_count": 1,
-                "graph_count": 0,
-            }
-
-            response = await client.post(
-                f"/api/v1/chat/{chatbot.access_url}/sessions/{chat_session.id}/messages",
-                json={"content": "What is the company policy?", "stream": False},
-            )
+        mock_retrieve["citations"] = [{"filename": "test.pdf", "page_num": 1}]
+        response = await client.post(
+            f"/api/v1/chat/{chatbot.access_url}/sessions/{chat_session.id}/messages",
+            json={"content": "What is the company policy?", "stream": False},
+        )
 
         assert response.status_code == 200
         data = response.json()
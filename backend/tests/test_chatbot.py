@@ -3,6 +3,7 @@ Chatbot management API tests.
 """
 import pytest
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models import ChatbotService, ChatbotStatus
 
@@ -34,9 +35,11 @@ class TestChatbotList:
 
     @pytest.mark.asyncio
     async def test_list_chatbots_with_data(
-        self, client: AsyncClient, auth_headers: dict, chatbot: ChatbotService
+        self, client: AsyncClient, auth_headers: dict, chatbot_factory
     ):
         """Test listing chatbots with existing data."""
+        rows = await chatbot_factory(3)
+
         response = await client.get(
             "/api/v1/chatbots",
             headers=auth_headers,
@@ -44,8 +47,8 @@ class TestChatbotList:
 
         assert response.status_code == 200
         data = response.json()
-        assert data["total"] >= 1
-        assert any(item["id"] == chatbot.id for item in data["items"])
+        assert data["total"] == 3
+        assert {item["id"] for item in data["items"]} == {row["id"] for row in rows}
 
 
 class TestChatbotCreate:
@@ -182,7 +185,11 @@ class TestChatbotDelete:
 
     @pytest.mark.asyncio
     async def test_delete_chatbot(
-        self, client: AsyncClient, auth_headers: dict, chatbot: ChatbotService
+        self,
+        client: AsyncClient,
+        auth_headers: dict,
+        chatbot: ChatbotService,
+        db_session: AsyncSession,
     ):
         """Test deleting chatbot."""
         response = await client.delete(
@@ -192,12 +199,8 @@ class TestChatbotDelete:
 
         assert response.status_code == 204
 
-        # Verify deletion
-        get_response = await client.get(
-            f"/api/v1/chatbots/{chatbot.id}",
-            headers=auth_headers,
-        )
-        assert get_response.status_code == 404
+        # Verify deletion in the database directly
+        assert await db_session.get(ChatbotService, chatbot.id) is None
 
     @pytest.mark.asyncio
     async def test_delete_nonexistent_chatbot(
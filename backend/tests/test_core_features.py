@@ -1,11 +1,20 @@
 """
 Core feature tests: Rate limiting, cancellation, message/stats counters.
 """
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from httpx import AsyncClient
+from sqlalchemy import insert
 
-from src.models import ChatbotService, ConversationSession
+from src.core.config import Settings
+from src.core.redis import RedisClient
+from src.models import ChatbotService, ConversationSession, Message, MessageRole
+from src.services.auth_service import AuthService
+from src.services.chat_service import ChatService
 
 
 class TestRateLimiting:
@@ -16,11 +25,9 @@ class TestRateLimiting:
         self, client: AsyncClient, chatbot: ChatbotService
     ):
         """Test that rate limit headers are present in responses."""
-        with patch("src.core.redis.RedisClient.get_client", return_value=None):
-            response = await client.get(f"/api/v1/chat/{chatbot.access_url}")
+        response = await client.get(f"/api/v1/chat/{chatbot.access_url}")
 
         assert response.status_code == 200
-        # Headers should be present (defaults when Redis unavailable)
         assert "X-RateLimit-Limit-Minute" in response.headers
         assert "X-RateLimit-Remaining-Minute" in response.headers
 
@@ -33,18 +40,19 @@ class TestRateLimiting:
         # (may still have headers but won't be limited)
 
     @pytest.mark.asyncio
-    async def test_rate_limit_exceeded_returns_429(self, client: AsyncClient, chatbot: ChatbotService):
+    async def test_rate_limit_exceeded_returns_429(
+        self, client: AsyncClient, chatbot: ChatbotService, fake_redis
+    ):
         """Test that exceeding rate limit returns 429."""
-        mock_redis = AsyncMock()
-        mock_redis.incr = AsyncMock(return_value=1000)  # Exceeds limit
-        mock_redis.get = AsyncMock(return_value=b"1000")
+        # Cover the next window too in case the minute rolls over mid-test
+        minute = int(time.time()) // 60
+        for window in (minute, minute + 1):
+            await fake_redis.set(f"rate_limit:{{ip:127.0.0.1}}:minute:{window}", 1000)
 
-        with patch("src.core.rate_limit.RedisClient.get_client", return_value=mock_redis):
-            response = await client.get(f"/api/v1/chat/{chatbot.access_url}")
+        response = await client.get(f"/api/v1/chat/{chatbot.access_url}")
 
-        # When rate limited, should return 429
-        # Note: This depends on the exact implementation
-        assert response.status_code in [200, 429]
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
 
 
 class TestStreamingCancellation:
@@ -69,8 +77,6 @@ class TestStreamingCancellation:
     @pytest.mark.asyncio
     async def test_cancel_token_checked_during_stream(self):
         """Test that cancellation is checked during streaming."""
-        from src.core.redis import RedisClient
-
         with patch.object(RedisClient, "is_cancelled", new_callable=AsyncMock) as mock_check:
             mock_check.return_value = False
 
@@ -82,8 +88,6 @@ class TestStreamingCancellation:
     @pytest.mark.asyncio
     async def test_cancel_token_cleared_after_completion(self):
         """Test that cancel token is cleared after stream completion."""
-        from src.core.redis import RedisClient
-
         with patch.object(RedisClient, "clear_cancel_token", new_callable=AsyncMock) as mock_clear:
             await RedisClient.clear_cancel_token("test-session-id")
             mock_clear.assert_called_once_with("test-session-id")
@@ -100,9 +104,6 @@ class TestMessageCounter:
         chat_session: ConversationSession,
     ):
         """Test that session message_count increments on add_message."""
-        from src.services.chat_service import ChatService
-        from src.models import MessageRole
-
         initial_count = chat_session.message_count
 
         # Add a message
@@ -113,18 +114,15 @@ class TestMessageCounter:
             content="Test message",
         )
 
-        # Refresh session
-        await db_session.refresh(chat_session)
-
+        # add_message updates the identity-mapped session in place
         assert chat_session.message_count == initial_count + 1
 
     @pytest.mark.asyncio
     async def test_message_count_in_session_response(
-        self, client: AsyncClient, chatbot: ChatbotService
+        self, client: AsyncClient, chatbot: ChatbotService, stats_counters
     ):
         """Test that message_count is returned in session response."""
-        with patch("src.services.stats_service.StatsService.increment_session_count", new_callable=AsyncMock):
-            response = await client.post(f"/api/v1/chat/{chatbot.access_url}/sessions")
+        response = await client.post(f"/api/v1/chat/{chatbot.access_url}/sessions")
 
         assert response.status_code == 200
         data = response.json()
@@ -137,17 +135,13 @@ class TestStatsCounter:
 
     @pytest.mark.asyncio
     async def test_session_count_incremented_on_create(
-        self, client: AsyncClient, chatbot: ChatbotService
+        self, client: AsyncClient, chatbot: ChatbotService, stats_counters
     ):
         """Test that session count is incremented when session is created."""
-        with patch(
-            "src.services.stats_service.StatsService.increment_session_count",
-            new_callable=AsyncMock
-        ) as mock_increment:
-            response = await client.post(f"/api/v1/chat/{chatbot.access_url}/sessions")
+        response = await client.post(f"/api/v1/chat/{chatbot.access_url}/sessions")
 
         assert response.status_code == 200
-        mock_increment.assert_called_once()
+        assert stats_counters.sessions == 1
 
     @pytest.mark.asyncio
     async def test_message_count_incremented_on_send(
@@ -157,26 +151,18 @@ class TestStatsCounter:
         chat_session: ConversationSession,
         mock_llm,
         mock_qdrant,
+        mock_retrieve,
+        stats_counters,
     ):
         """Test that message count is incremented when message is sent."""
-        with patch("src.services.stats_service.StatsService.increment_message_count", new_callable=AsyncMock) as mock_increment, \
-             patch("src.services.retrieval.retrieve_context", new_callable=AsyncMock) as mock_retrieve:
-
-            mock_retrieve.return_value = {
-                "context": "Test context",
-                "citations": [],
-                "vector_count": 1,
-                "graph_count": 0,
-            }
-
-            response = await client.post(
-                f"/api/v1/chat/{chatbot.access_url}/sessions/{chat_session.id}/messages",
-                json={"content": "Test message", "stream": False},
-            )
+        response = await client.post(
+            f"/api/v1/chat/{chatbot.access_url}/sessions/{chat_session.id}/messages",
+            json={"content": "Test message", "stream": False},
+        )
 
         assert response.status_code == 200
         # Should be called twice: once for user message, once for assistant
-        assert mock_increment.call_count == 2
+        assert stats_counters.messages == 2
 
 
 class TestChatHistoryOrder:
@@ -185,17 +171,23 @@ class TestChatHistoryOrder:
     @pytest.mark.asyncio
     async def test_chat_history_returns_recent_messages(self, db_session, chat_session):
         """Test that get_chat_history returns most recent messages."""
-        from src.services.chat_service import ChatService
-        from src.models import MessageRole
-
-        # Add 15 messages
-        for i in range(15):
-            await ChatService.add_message(
-                db=db_session,
-                session_id=chat_session.id,
-                role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
-                content=f"Message {i}",
-            )
+        # Add 15 messages in one insert, one second apart
+        base_time = datetime.utcnow()
+        await db_session.execute(
+            insert(Message),
+            [
+                {
+                    "id": str(uuid4()),
+                    "session_id": chat_session.id,
+                    "chatbot_id": chat_session.chatbot_id,
+                    "role": MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                    "content": f"Message {i}",
+                    "created_at": base_time + timedelta(seconds=i),
+                }
+                for i in range(15)
+            ],
+        )
+        await db_session.flush()
 
         # Get chat history with limit of 10
         history = await ChatService.get_chat_history(
@@ -213,59 +205,44 @@ class TestChatHistoryOrder:
 class TestPasswordValidation:
     """Tests for password validation."""
 
-    def test_weak_password_rejected(self):
+    @pytest.mark.parametrize("pwd", ["admin123", "password", "12345678", "abc"])
+    def test_weak_password_rejected(self, pwd: str):
         """Test that weak passwords are rejected."""
-        from src.services.auth_service import AuthService
-
-        weak_passwords = ["admin123", "password", "12345678", "abc"]
+        is_valid, _ = AuthService.validate_password_strength(pwd)
+        assert not is_valid, f"Password '{pwd}' should be rejected"
 
-        for pwd in weak_passwords:
-            is_valid, _ = AuthService.validate_password_strength(pwd)
-            assert not is_valid, f"Password '{pwd}' should be rejected"
-
-    def test_strong_password_accepted(self):
+    @pytest.mark.parametrize("pwd", ["SecureP@ss1", "MyStr0ngPwd!", "C0mplexPass"])
+    def test_strong_password_accepted(self, pwd: str):
         """Test that strong passwords are accepted."""
-        from src.services.auth_service import AuthService
-
-        strong_passwords = ["SecureP@ss1", "MyStr0ngPwd!", "C0mplexPass"]
-
-        for pwd in strong_passwords:
-            is_valid, error = AuthService.validate_password_strength(pwd)
-            assert is_valid, f"Password '{pwd}' should be accepted, got error: {error}"
+        is_valid, error = AuthService.validate_password_strength(pwd)
+        assert is_valid, f"Password '{pwd}' should be accepted, got error: {error}"
 
 
 class TestSecurityConfiguration:
     """Tests for security configuration detection."""
 
-    def test_default_credentials_detected(self):
+    def test_default_credentials_detected(self, base_settings: Settings):
         """Test that default credentials are detected."""
-        from src.core.config import Settings
-
-        # Create settings with defaults
-        settings = Settings(
-            admin_email="admin@example.com",
-            admin_password="admin123",
-        )
+        settings = base_settings.model_copy(update={
+            "admin_email": "admin@example.com",
+            "admin_password": "admin123",
+        })
 
         assert settings.is_using_default_credentials
 
-    def test_custom_credentials_not_flagged(self):
+    def test_custom_credentials_not_flagged(self, base_settings: Settings):
         """Test that custom credentials are not flagged as default."""
-        from src.core.config import Settings
-
-        settings = Settings(
-            admin_email="custom@company.com",
-            admin_password="SecureP@ss123",
-        )
+        settings = base_settings.model_copy(update={
+            "admin_email": "custom@company.com",
+            "admin_password": "SecureP@ss123",
+        })
 
         assert not settings.is_using_default_credentials
 
-    def test_default_jwt_secret_detected(self):
+    def test_default_jwt_secret_detected(self, base_settings: Settings):
         """Test that default JWT secret is detected."""
-        from src.core.config import Settings
-
-        settings = Settings(
-            jwt_secret_key="your-secret-key-change-in-production",
-        )
+        settings = base_settings.model_copy(update={
+            "jwt_secret_key": "your-secret-key-change-in-production",
+        })
 
         assert settings.is_using_default_jwt_secret
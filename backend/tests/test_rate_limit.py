@@ -2,22 +2,48 @@
 Integration tests for rate limiting middleware.
 """
 import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Optional
 from unittest.mock import AsyncMock, patch, MagicMock
 
 import pytest
+from fakeredis.aioredis import FakeRedis
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.testclient import TestClient
+from starlette.datastructures import Address
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from src.core.local_bucket import LocalBucketCache
 from src.core.rate_limit import (
+    ApproximateSlidingWindowLimiter,
     RateLimiter,
     RateLimitMiddleware,
     RateLimitExceeded,
+    RateLimitResult,
     setup_rate_limiting,
     get_rate_limiter,
 )
 
 
+@dataclass
+class FakeRequest:
+    """The parts of a request the rate limiter reads."""
+    headers: dict = field(default_factory=dict)
+    client: Optional[Address] = None
+
+    @classmethod
+    def make(cls, ip: str = "127.0.0.1", headers: Optional[dict] = None):
+        return cls(headers=headers or {}, client=Address(ip, 12345))
+
+
+@pytest.fixture
+def mock_request():
+    """Create a lightweight request stub."""
+    return FakeRequest.make()
+
+
 class TestRateLimiter:
     """Tests for RateLimiter class."""
 
@@ -30,15 +56,6 @@ class TestRateLimiter:
             prefix="test_rate_limit",
         )
 
-    @pytest.fixture
-    def mock_request(self):
-        """Create a mock request."""
-        request = MagicMock()
-        request.headers = {}
-        request.client = MagicMock()
-        request.client.host = "127.0.0.1"
-        return request
-
     def test_get_client_id_from_ip(self, rate_limiter, mock_request):
         """Test client ID extraction from IP address."""
         client_id = rate_limiter._get_client_id(mock_request)
@@ -50,12 +67,31 @@ class TestRateLimiter:
         client_id = rate_limiter._get_client_id(mock_request)
         assert client_id == "ip:192.168.1.1"
 
+    def test_get_client_id_from_long_forwarded_chain(self, rate_limiter, mock_request):
+        """Test that only the first hop of a long proxy chain is used."""
+        hops = ", ".join(f"10.0.0.{i}" for i in range(50))
+        mock_request.headers = {"X-Forwarded-For": f" 203.0.113.7 , {hops}"}
+        client_id = rate_limiter._get_client_id(mock_request)
+        assert client_id == "ip:203.0.113.7"
+
+    def test_window_keys_share_hash_tag(self, rate_limiter):
+        """Test that a client's keys land in one Redis Cluster slot."""
+        minute_key, hour_key = rate_limiter._window_keys("ip:127.0.0.1", 7200)
+        assert minute_key == "test_rate_limit:{ip:127.0.0.1}:minute:120"
+        assert hour_key == "test_rate_limit:{ip:127.0.0.1}:hour:2"
+
     def test_get_client_id_from_bearer_token(self, rate_limiter, mock_request):
         """Test client ID extraction from Bearer token."""
         mock_request.headers = {"Authorization": "Bearer test_token_123"}
         client_id = rate_limiter._get_client_id(mock_request)
         assert client_id.startswith("user:")
 
+    def test_get_client_id_bearer_hash_is_stable(self, rate_limiter, mock_request):
+        """Test that the token hash is fixed, so all workers share counters."""
+        mock_request.headers = {"Authorization": "Bearer test_token_123"}
+        client_id = rate_limiter._get_client_id(mock_request)
+        assert client_id == "user:b8ebe819905cb631"
+
     @pytest.mark.asyncio
     async def test_is_allowed_when_redis_unavailable(self, rate_limiter, mock_request):
         """Test that requests are allowed when Redis is unavailable."""
@@ -68,8 +104,7 @@ class TestRateLimiter:
     async def test_is_allowed_within_limit(self, rate_limiter, mock_request):
         """Test that requests within limit are allowed."""
         mock_redis = AsyncMock()
-        mock_redis.incr.return_value = 1
-        mock_redis.expire.return_value = True
+        mock_redis.evalsha.return_value = [1, 1]
 
         with patch(
             "src.core.rate_limit.RedisClient.get_client",
@@ -78,12 +113,50 @@ class TestRateLimiter:
             is_allowed, retry_after = await rate_limiter.is_allowed(mock_request)
             assert is_allowed is True
             assert retry_after is None
+            # Both windows are counted in one round trip
+            mock_redis.evalsha.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_check_and_report_remaining(self, rate_limiter, mock_request):
+        """Test that the check reports what is left in each window."""
+        mock_redis = AsyncMock()
+        mock_redis.evalsha.return_value = [2, 40]
+
+        with patch(
+            "src.core.rate_limit.RedisClient.get_client",
+            return_value=mock_redis,
+        ):
+            result = await rate_limiter.check_and_report(mock_request)
+
+        assert result == RateLimitResult(
+            allowed=True, retry_after=None, minute_remaining=3, hour_remaining=60
+        )
+
+    @pytest.mark.asyncio
+    async def test_is_allowed_sets_expire_only_on_first_hit(
+        self, rate_limiter, mock_request
+    ):
+        """Test that a window's expiry is set on its first hit only."""
+        redis = FakeRedis()
+
+        with patch(
+            "src.core.rate_limit.RedisClient.get_client",
+            return_value=redis,
+        ):
+            await rate_limiter.is_allowed(mock_request)
+            minute_key = (await redis.keys("test_rate_limit:*:minute:*"))[0]
+            assert 0 < await redis.pttl(minute_key) <= 60_000
+
+            # A later hit in the same window must not push the expiry out
+            await redis.pexpire(minute_key, 5_000)
+            await rate_limiter.is_allowed(mock_request)
+            assert await redis.pttl(minute_key) <= 5_000
 
     @pytest.mark.asyncio
     async def test_is_allowed_exceeds_minute_limit(self, rate_limiter, mock_request):
         """Test that requests exceeding minute limit are blocked."""
         mock_redis = AsyncMock()
-        mock_redis.incr.return_value = 10  # Exceeds limit of 5
+        mock_redis.evalsha.return_value = [10, 0]  # Exceeds limit of 5
 
         with patch(
             "src.core.rate_limit.RedisClient.get_client",
@@ -94,11 +167,204 @@ class TestRateLimiter:
             assert retry_after is not None
             assert 0 < retry_after <= 60
 
+    @pytest.mark.asyncio
+    async def test_local_bucket_short_circuits_redis(self, mock_request):
+        """Test that requests within the local share never reach Redis."""
+        rate_limiter = RateLimiter(
+            requests_per_minute=6, prefix="test_rate_limit", local_workers=2
+        )
+
+        with patch(
+            "src.core.rate_limit.RedisClient.get_client",
+            new_callable=AsyncMock,
+        ) as mock_get_client:
+            for _ in range(3):
+                assert await rate_limiter.is_allowed(mock_request) == (True, None)
+            mock_get_client.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_local_bucket_reports_to_redis_when_spent(self, mock_request):
+        """Test that a spent local share is recorded and denials are cached."""
+        rate_limiter = RateLimiter(
+            requests_per_minute=6, prefix="test_rate_limit", local_workers=2
+        )
+        redis = FakeRedis()
+
+        with patch(
+            "src.core.rate_limit.RedisClient.get_client",
+            new_callable=AsyncMock,
+            return_value=redis,
+        ) as mock_get_client:
+            results = [await rate_limiter.is_allowed(mock_request) for _ in range(8)]
+
+        assert [allowed for allowed, _ in results] == [True] * 6 + [False] * 2
+        minute_key = (await redis.keys("test_rate_limit:*:minute:*"))[0]
+        # The three local requests were recorded along with the fourth
+        assert int(await redis.get(minute_key)) == 7
+        # The last denial came from the local block, not Redis
+        assert mock_get_client.await_count == 4
+
+    @pytest.mark.asyncio
+    async def test_local_bucket_flushes_within_share(self, mock_request):
+        """Test that a client staying within its share still reaches Redis."""
+        rate_limiter = RateLimiter(
+            requests_per_minute=60, prefix="test_rate_limit", local_workers=4
+        )
+        redis = FakeRedis()
+        now = [1000.0]
+
+        with patch(
+            "src.core.rate_limit.RedisClient.get_client",
+            new_callable=AsyncMock,
+            return_value=redis,
+        ), patch("src.core.local_bucket.time.monotonic", lambda: now[0]):
+            for _ in range(4):
+                assert await rate_limiter.is_allowed(mock_request) == (True, None)
+                now[0] += 6  # past the flush interval, well within the share
+
+        hour_key = (await redis.keys("test_rate_limit:*:hour:*"))[0]
+        # Every other request carried the one served locally before it
+        assert int(await redis.get(hour_key)) == 4
+
+    def test_local_share_capped_by_hour_limit(self):
+        """Test that the local share follows the hour limit spread per minute."""
+        rate_limiter = RateLimiter(
+            requests_per_minute=60, requests_per_hour=600, local_workers=2
+        )
+        assert rate_limiter._local.capacity == 5
+        assert RateLimiter(
+            requests_per_minute=60, requests_per_hour=100, local_workers=4
+        )._local is None
+
+    def test_local_eviction_keeps_unreported_and_blocked_buckets(self):
+        """Test that eviction skips buckets holding state Redis has not seen."""
+        cache = LocalBucketCache(5, max_clients=3)
+        cache.try_consume("pending")
+        cache.block("blocked", 60)
+        cache.try_consume("idle")
+        cache.take_pending("idle")
+
+        cache.try_consume("new")
+
+        assert list(cache._buckets) == ["pending", "blocked", "new"]
+        assert cache.take_pending("pending") == 1
+
+    @pytest.mark.asyncio
+    async def test_minute_denial_records_served_requests_in_hour(self, rate_limiter):
+        """Test that locally served requests count toward the hour when denied."""
+        redis = FakeRedis()
+        minute_key, hour_key = rate_limiter._window_keys("ip:1.2.3.4", int(time.time()))
+        await redis.set(minute_key, 5)
+
+        result = await rate_limiter._check(redis, "ip:1.2.3.4", 3)
+
+        assert result.allowed is False
+        assert int(await redis.get(hour_key)) == 2
+
     @pytest.mark.asyncio
     async def test_get_remaining(self, rate_limiter, mock_request):
         """Test getting remaining request counts."""
         mock_redis = AsyncMock()
-        mock_redis.get.side_effect = [b"3", b"50"]
+        mock_redis.mget.return_value = [b"3", b"50"]
+
+        with patch(
+            "src.core.rate_limit.RedisClient.get_client",
+            return_value=mock_redis,
+        ):
+            remaining = await rate_limiter.get_remaining(mock_request)
+            assert remaining["minute_remaining"] == 2  # 5 - 3
+            assert remaining["hour_remaining"] == 50  # 100 - 50
+            mock_redis.mget.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_get_remaining_without_counters(self, rate_limiter, mock_request):
+        """Test that missing window counters count as zero."""
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [None, None]
+
+        with patch(
+            "src.core.rate_limit.RedisClient.get_client",
+            return_value=mock_redis,
+        ):
+            remaining = await rate_limiter.get_remaining(mock_request)
+            assert remaining["minute_remaining"] == 5
+            assert remaining["hour_remaining"] == 100
+
+
+class TestApproximateSliding:
+    """Tests for ApproximateSlidingWindowLimiter class."""
+
+    @pytest.fixture
+    def rate_limiter(self):
+        """Create an approximate sliding window limiter for testing."""
+        return ApproximateSlidingWindowLimiter(
+            requests_per_minute=5,
+            requests_per_hour=100,
+            prefix="test_rate_limit",
+        )
+
+    @pytest.mark.asyncio
+    async def test_is_allowed_when_redis_unavailable(self, rate_limiter, mock_request):
+        """Test that requests are allowed when Redis is unavailable."""
+        with patch("src.core.rate_limit.RedisClient.get_client", return_value=None):
+            is_allowed, retry_after = await rate_limiter.is_allowed(mock_request)
+            assert is_allowed is True
+            assert retry_after is None
+
+    @pytest.mark.asyncio
+    async def test_is_allowed_within_limit(self, rate_limiter, mock_request):
+        """Test that requests within limit are allowed."""
+        mock_redis = AsyncMock()
+        mock_redis.evalsha.return_value = [1, 0, 0]
+
+        with patch(
+            "src.core.rate_limit.RedisClient.get_client",
+            return_value=mock_redis,
+        ):
+            is_allowed, retry_after = await rate_limiter.is_allowed(mock_request)
+            assert is_allowed is True
+            assert retry_after is None
+            mock_redis.evalsha.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_is_allowed_exceeds_minute_limit(self, rate_limiter, mock_request):
+        """Test that requests exceeding minute limit are blocked."""
+        mock_redis = AsyncMock()
+        mock_redis.evalsha.return_value = [0, 5, 5]
+
+        with patch(
+            "src.core.rate_limit.RedisClient.get_client",
+            return_value=mock_redis,
+        ):
+            is_allowed, retry_after = await rate_limiter.is_allowed(mock_request)
+            assert is_allowed is False
+            assert 0 < retry_after <= 60
+
+    @pytest.mark.asyncio
+    async def test_previous_window_counts_against_limit(
+        self, rate_limiter, mock_request
+    ):
+        """Test that a busy previous minute still limits the current one."""
+        redis = FakeRedis()
+        previous_minute_key = rate_limiter._sliding_keys(
+            "ip:127.0.0.1", int(time.time())
+        )[0]
+        # Large enough to exceed the limit at any point in the current minute
+        await redis.set(previous_minute_key, 1_000_000)
+
+        with patch(
+            "src.core.rate_limit.RedisClient.get_client",
+            return_value=redis,
+        ):
+            is_allowed, retry_after = await rate_limiter.is_allowed(mock_request)
+            assert is_allowed is False
+            assert 0 < retry_after <= 60
+
+    @pytest.mark.asyncio
+    async def test_get_remaining(self, rate_limiter, mock_request):
+        """Test getting remaining request counts."""
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [None, b"3", None, b"50"]
 
         with patch(
             "src.core.rate_limit.RedisClient.get_client",
@@ -139,6 +405,32 @@ class TestRateLimitMiddleware:
         response = client.get("/health")
         assert response.status_code == 200
 
+    @pytest.mark.parametrize(
+        "path, excluded",
+        [
+            ("/health", True),
+            ("/docs", True),
+            ("/api/v1/health", True),
+            ("/api/v1/health/live", True),
+            ("/api/v1/healthz", False),
+            ("/api/v1/chatbots", False),
+            ("/docs/extra", False),
+        ],
+    )
+    def test_excluded_paths_prefix_trie(self, path, excluded):
+        """Test exact and prefix exclusion matching."""
+        middleware = RateLimitMiddleware(AsyncMock())
+        assert middleware._is_excluded(path) is excluded
+
+    def test_excluded_paths_override(self):
+        """Test that explicit exclusions replace the defaults."""
+        middleware = RateLimitMiddleware(
+            AsyncMock(), excluded_paths=["/metrics"], excluded_prefixes=["/static"]
+        )
+        assert middleware._is_excluded("/metrics")
+        assert middleware._is_excluded("/static/app.js")
+        assert not middleware._is_excluded("/docs")
+
     def test_rate_limit_headers_added(self, client):
         """Test that rate limit headers are added to responses."""
         with patch(
@@ -151,19 +443,105 @@ class TestRateLimitMiddleware:
             assert "X-RateLimit-Limit-Minute" in response.headers
             assert "X-RateLimit-Remaining-Minute" in response.headers
 
+    def test_rate_limit_headers_from_single_check(self, client):
+        """Test that headers come from the check itself, in one round trip."""
+        mock_redis = AsyncMock()
+        mock_redis.evalsha.return_value = [3, 3]
+
+        with patch(
+            "src.core.rate_limit.RedisClient.get_client",
+            return_value=mock_redis,
+        ):
+            response = client.get("/test")
+
+        assert response.status_code == 200
+        limit = int(response.headers["X-RateLimit-Limit-Minute"])
+        assert response.headers["X-RateLimit-Remaining-Minute"] == str(limit - 3)
+        mock_redis.evalsha.assert_awaited_once()
+        mock_redis.mget.assert_not_awaited()
+
+    def test_limiter_resolved_once(self):
+        """Test that an explicit limiter is used without per-request lookups."""
+        limiter = MagicMock(requests_per_minute=7)
+        limiter.check_and_report = AsyncMock(
+            return_value=RateLimitResult(True, None, 6, 99)
+        )
+        app = FastAPI()
+
+        @app.get("/test")
+        async def test_endpoint():
+            return {"status": "ok"}
+
+        app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+        with patch("src.core.rate_limit.get_rate_limiter") as mock_get_limiter:
+            client = TestClient(app)
+            for _ in range(3):
+                response = client.get("/test")
+
+        assert response.headers["X-RateLimit-Limit-Minute"] == "7"
+        assert response.headers["X-RateLimit-Remaining-Minute"] == "6"
+        assert limiter.check_and_report.await_count == 3
+        mock_get_limiter.assert_not_called()
+
+    def test_rate_limited_response(self):
+        """Test that the prebuilt 429 body matches a JSONResponse."""
+        limiter = MagicMock(requests_per_minute=5)
+        limiter.check_and_report = AsyncMock(
+            return_value=RateLimitResult(False, 42, 0, 10)
+        )
+        app = FastAPI()
+        app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+        response = TestClient(app).get("/test")
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "42"
+        assert response.headers["Content-Type"] == "application/json"
+        assert response.content == JSONResponse(
+            content={"detail": "Rate limit exceeded. Please try again later."}
+        ).body
+
+    @pytest.mark.asyncio
+    async def test_non_http_scope_passes_through(self):
+        """Test that lifespan and websocket scopes skip rate limiting."""
+        inner = AsyncMock()
+        middleware = RateLimitMiddleware(inner)
+        scope = {"type": "lifespan"}
+
+        with patch("src.core.rate_limit.get_rate_limiter") as mock_get_limiter:
+            await middleware(scope, None, None)
+
+        inner.assert_awaited_once_with(scope, None, None)
+        mock_get_limiter.assert_not_called()
+
 
 class TestSetupRateLimiting:
     """Tests for setup_rate_limiting function."""
 
-    def test_setup_rate_limiting_enabled(self):
+    @pytest.mark.parametrize("strategy", [None, "fixed", "approximate"])
+    def test_setup_rate_limiting_enabled(self, strategy):
         """Test that middleware is added when enabled."""
         app = FastAPI()
         initial_middleware_count = len(app.user_middleware)
 
-        setup_rate_limiting(app, enabled=True)
+        setup_rate_limiting(app, enabled=True, strategy=strategy)
 
         assert len(app.user_middleware) == initial_middleware_count + 1
 
+    def test_setup_rate_limiting_unknown_strategy(self):
+        """Test that an unknown strategy is rejected."""
+        with pytest.raises(ValueError):
+            setup_rate_limiting(FastAPI(), enabled=True, strategy="leaky")
+
+    def test_get_rate_limiter_by_strategy(self):
+        """Test that each strategy gets its own shared limiter."""
+        limiter = get_rate_limiter("approximate")
+
+        assert isinstance(limiter, ApproximateSlidingWindowLimiter)
+        assert get_rate_limiter("approximate") is limiter
+        assert type(get_rate_limiter("fixed")) is RateLimiter
+
     def test_setup_rate_limiting_disabled(self):
         """Test that middleware is not added when disabled."""
         app = FastAPI()
@@ -189,6 +567,14 @@ class TestRateLimitExceeded:
         exc = RateLimitExceeded()
         assert exc.headers["Retry-After"] == "60"
 
+    @pytest.mark.parametrize("retry_after", [60, 37])
+    def test_rate_limit_exceeded_headers_read_only(self, retry_after):
+        """Test that headers, shared for common values, cannot be mutated."""
+        exc = RateLimitExceeded(retry_after=retry_after)
+        assert exc.headers["Retry-After"] == str(retry_after)
+        with pytest.raises(TypeError):
+            exc.headers["Retry-After"] = "1"
+
 
 class TestIntegration:
     """Integration tests for rate limiting."""
@@ -215,16 +601,8 @@ class TestIntegration:
 
         # Mock Redis to simulate rate limiting
         mock_redis = AsyncMock()
-        call_count = 0
-
-        async def mock_incr(key):
-            nonlocal call_count
-            call_count += 1
-            return call_count
-
-        mock_redis.incr = mock_incr
-        mock_redis.expire = AsyncMock(return_value=True)
-        mock_redis.get = AsyncMock(return_value=b"1")
+        mock_redis.evalsha = AsyncMock(return_value=[1, 1])
+        mock_redis.mget = AsyncMock(return_value=[b"1", b"1"])
 
         with patch(
             "src.core.rate_limit.RedisClient.get_client",
@@ -98,19 +98,31 @@ CREATE TABLE conversation_sessions (
 
 CREATE INDEX idx_session_chatbot ON conversation_sessions(chatbot_id);
 CREATE INDEX idx_session_expires ON conversation_sessions(expires_at);
+CREATE INDEX idx_session_chatbot_created ON conversation_sessions(chatbot_id, created_at);
+CREATE INDEX idx_session_created ON conversation_sessions(created_at, chatbot_id);
 
 -- Messages
 CREATE TABLE messages (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     session_id UUID NOT NULL REFERENCES conversation_sessions(id) ON DELETE CASCADE,
+    chatbot_id UUID REFERENCES chatbot_services(id) ON DELETE CASCADE,
     role message_role NOT NULL,
     content TEXT NOT NULL,
     sources JSONB,
+    response_time_ms INTEGER,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    retrieval_count INTEGER,
+    retrieval_time_ms INTEGER,
     created_at TIMESTAMP NOT NULL DEFAULT NOW()
 );
 
 CREATE INDEX idx_message_session ON messages(session_id);
-CREATE INDEX idx_message_created ON messages(session_id, created_at);
+CREATE INDEX idx_message_session_created_role ON messages(session_id, created_at, role)
+    INCLUDE (response_time_ms, input_tokens, output_tokens, retrieval_count, retrieval_time_ms);
+CREATE INDEX idx_message_created_at ON messages(created_at) INCLUDE (session_id);
+CREATE INDEX idx_message_chatbot_created_role ON messages(chatbot_id, created_at, role)
+    INCLUDE (response_time_ms, input_tokens, output_tokens, retrieval_count, retrieval_time_ms);
 
 -- Chatbot Statistics (Daily Aggregation)
 CREATE TABLE chatbot_stats (
@@ -120,6 +132,14 @@ CREATE TABLE chatbot_stats (
     session_count INTEGER DEFAULT 0,
     message_count INTEGER DEFAULT 0,
     avg_response_time_ms INTEGER,
+    total_input_tokens INTEGER DEFAULT 0,
+    total_output_tokens INTEGER DEFAULT 0,
+    total_retrieval_count INTEGER DEFAULT 0,
+    avg_retrieval_time_ms INTEGER,
+    response_time_sum_ms BIGINT DEFAULT 0,
+    response_time_samples INTEGER DEFAULT 0,
+    retrieval_time_sum_ms BIGINT DEFAULT 0,
+    retrieval_time_samples INTEGER DEFAULT 0,
     UNIQUE(chatbot_id, date)
 );
 
@@ -5,10 +5,13 @@ Tests the HR Policy chatbot with 20 predefined test cases.
 Measures response quality and latency.
 """
 
+import argparse
+import asyncio
 import json
 import os
+import re
 import time
-import requests
+import httpx
 from datetime import datetime
 from pathlib import Path
 
@@ -19,19 +22,19 @@ ACCESS_URL = os.getenv("TEST_ACCESS_URL", "hr-policy")
 # Project root directory (relative to this script)
 PROJECT_ROOT = Path(__file__).parent
 
-def create_session():
+async def create_session(client: httpx.AsyncClient):
     """Create a new chat session."""
-    response = requests.post(f"{BASE_URL}/api/v1/chat/{ACCESS_URL}/sessions")
+    response = await client.post(f"{BASE_URL}/api/v1/chat/{ACCESS_URL}/sessions")
     if response.status_code != 200:
         print(f"Failed to create session: {response.text}")
         return None
     return response.json()["id"]
 
-def send_message(session_id: str, message: str):
+async def send_message(client: httpx.AsyncClient, session_id: str, message: str):
     """Send a message and get response (non-streaming)."""
     start_time = time.time()
 
-    response = requests.post(
+    response = await client.post(
         f"{BASE_URL}/api/v1/chat/{ACCESS_URL}/sessions/{session_id}/messages",
         json={"content": message, "stream": False},
         timeout=180
@@ -48,21 +51,115 @@ def send_message(session_id: str, message: str):
 
 def check_keywords(response: str, expected_keywords: list) -> tuple:
     """Check if response contains expected keywords."""
+    if not expected_keywords:
+        return 0, [], []
+
+    # One pass over the response for all keywords
+    pattern = re.compile("|".join(map(re.escape, expected_keywords)), re.IGNORECASE)
+    hits = {match.lower() for match in pattern.findall(response)}
+
+    # Matches don't overlap, so a keyword inside another one that matched at
+    # the same spot (e.g. "leave" in "leave policy") needs a direct check
+    response_lower = None
     found = []
     missing = []
-    response_lower = response.lower()
-
     for keyword in expected_keywords:
-        if keyword.lower() in response_lower:
-            found.append(keyword)
-        else:
-            missing.append(keyword)
-
-    score = len(found) / len(expected_keywords) if expected_keywords else 0
+        keyword_lower = keyword.lower()
+        if keyword_lower not in hits:
+            if response_lower is None:
+                response_lower = response.lower()
+            if keyword_lower not in response_lower:
+                missing.append(keyword)
+                continue
+        found.append(keyword)
+
+    score = len(found) / len(expected_keywords)
     return score, found, missing
 
-def run_tests():
-    """Run all test cases and collect results."""
+async def run_one(
+    client: httpx.AsyncClient,
+    index: int,
+    total: int,
+    test_case: dict,
+    session_id: str = None,
+):
+    """
+    Run a single test case.
+
+    Output is collected and returned rather than printed, so tests running
+    concurrently do not interleave their reports.
+
+    Args:
+        session_id: Chat session to use; a new one is created if not given
+
+    Returns:
+        Tuple of (result dict or None if no session could be created, output lines)
+    """
+    out = [
+        f"\n[Test {index}/{total}] {test_case['category']} - {test_case['difficulty']}",
+        f"Question: {test_case['question']}",
+        "-" * 60,
+    ]
+
+    # Create new session for each test unless one is shared
+    if session_id is None:
+        session_id = await create_session(client)
+    if not session_id:
+        out.append("Failed to create session, skipping...")
+        return None, out
+
+    # Send message
+    response, latency, sources = await send_message(client, session_id, test_case["question"])
+
+    if response is None:
+        out.append(f"Error: {sources}")
+        return {
+            "id": test_case["id"],
+            "category": test_case["category"],
+            "difficulty": test_case["difficulty"],
+            "question": test_case["question"],
+            "response": None,
+            "latency": latency,
+            "score": 0,
+            "error": str(sources)
+        }, out
+
+    # Check keywords
+    score, found, missing = check_keywords(response, test_case["expected_keywords"])
+
+    out.append(f"Response ({latency:.2f}s):")
+    out.append(response[:500] + "..." if len(response) > 500 else response)
+    out.append("")
+    out.append(f"Keyword Score: {score*100:.1f}%")
+    out.append(f"  Found: {found}")
+    out.append(f"  Missing: {missing}")
+    if sources:
+        out.append(f"  Sources: {len(sources)} citations")
+
+    return {
+        "id": test_case["id"],
+        "category": test_case["category"],
+        "difficulty": test_case["difficulty"],
+        "question": test_case["question"],
+        "response": response,
+        "latency": latency,
+        "score": score,
+        "found_keywords": found,
+        "missing_keywords": missing,
+        "sources": sources
+    }, out
+
+async def run_tests(parallel: int = 1, keepalive: bool = True, shared_session: bool = False):
+    """
+    Run all test cases and collect results.
+
+    Args:
+        parallel: Number of test cases in flight at once. Each test uses its
+            own session, so they are independent; 1 runs them sequentially.
+        keepalive: Reuse HTTP connections across requests
+        shared_session: Send every question in one chat session instead of
+            a new session per test
+    """
     # Load test cases from project directory
     test_cases_path = PROJECT_ROOT / "test_cases.json"
     if not test_cases_path.exists():
@@ -74,7 +171,6 @@ def run_tests():
         test_data = json.load(f)
 
     test_cases = test_data["test_cases"]
-    results = []
 
     print("=" * 80)
     print("GraphRAG HR Policy Bot Test Run")
@@ -82,64 +178,39 @@ def run_tests():
     print("=" * 80)
     print()
 
-    total_latency = 0
-    total_score = 0
-
-    for i, test_case in enumerate(test_cases, 1):
-        print(f"\n[Test {i}/{len(test_cases)}] {test_case['category']} - {test_case['difficulty']}")
-        print(f"Question: {test_case['question']}")
-        print("-" * 60)
-
-        # Create new session for each test
-        session_id = create_session()
-        if not session_id:
-            print("Failed to create session, skipping...")
-            continue
-
-        # Send message
-        response, latency, sources = send_message(session_id, test_case["question"])
-
-        if response is None:
-            print(f"Error: {sources}")
-            results.append({
-                "id": test_case["id"],
-                "category": test_case["category"],
-                "difficulty": test_case["difficulty"],
-                "question": test_case["question"],
-                "response": None,
-                "latency": latency,
-                "score": 0,
-                "error": str(sources)
-            })
-            continue
-
-        # Check keywords
-        score, found, missing = check_keywords(response, test_case["expected_keywords"])
-
-        total_latency += latency
-        total_score += score
-
-        print(f"Response ({latency:.2f}s):")
-        print(response[:500] + "..." if len(response) > 500 else response)
-        print()
-        print(f"Keyword Score: {score*100:.1f}%")
-        print(f"  Found: {found}")
-        print(f"  Missing: {missing}")
-        if sources:
-            print(f"  Sources: {len(sources)} citations")
-
-        results.append({
-            "id": test_case["id"],
-            "category": test_case["category"],
-            "difficulty": test_case["difficulty"],
-            "question": test_case["question"],
-            "response": response,
-            "latency": latency,
-            "score": score,
-            "found_keywords": found,
-            "missing_keywords": missing,
-            "sources": sources
-        })
+    semaphore = asyncio.Semaphore(max(1, parallel))
+
+    # Completed results are also appended here as they finish, one JSON
+    # object per line, so an interrupted run keeps what it already has
+    progress_path = PROJECT_ROOT / "test_results.jsonl"
+    progress = open(progress_path, "w", encoding="utf-8")
+
+    async def run_and_report(client, index, test_case):
+        async with semaphore:
+            result, out = await run_one(
+                client, index, len(test_cases), test_case, session_id
+            )
+        print("\n".join(out))
+        if result is not None:
+            progress.write(json.dumps(result, ensure_ascii=False) + "\n")
+            progress.flush()
+        return result
+
+    limits = httpx.Limits(
+        max_connections=16,
+        max_keepalive_connections=16 if keepalive else 0,
+    )
+    with progress:
+        async with httpx.AsyncClient(limits=limits, timeout=None) as client:
+            # A shared session saves a request per test, but each question is
+            # then answered with the earlier ones in its conversation history,
+            # so results are no longer independent of test order
+            session_id = await create_session(client) if shared_session else None
+            # gather keeps results in test case order regardless of completion order
+            results = await asyncio.gather(*(
+                run_and_report(client, i, tc) for i, tc in enumerate(test_cases, 1)
+            ))
+    results = [r for r in results if r is not None]
 
     # Summary
     print("\n" + "=" * 80)
@@ -205,4 +276,28 @@ def run_tests():
     return results
 
 if __name__ == "__main__":
-    run_tests()
+    parser = argparse.ArgumentParser(description="Run the GraphRAG chatbot test cases")
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Number of test cases to run concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--keepalive",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Reuse HTTP connections across requests (default: on)",
+    )
+    parser.add_argument(
+        "--shared-session",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Ask every question in one chat session (default: a new session per test)",
+    )
+    args = parser.parse_args()
+    asyncio.run(run_tests(
+        parallel=args.parallel,
+        keepalive=args.keepalive,
+        shared_session=args.shared_session,
+    ))